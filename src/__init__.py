@@ -1,8 +1,17 @@
 import os
+import tempfile
+import soundfile as sf
 from .audiosetting import AudioEnhancer
 from .videosetting import VideoEnhancer
 from .videomerger import VideoAudioMerger
 from .conectintro import VideoMerger
+from .gpupipeline import GpuColorPipeline
+
+# Accepted file extensions per expected input type
+_EXTS = {
+    "audio": frozenset({".mp3", ".wav", ".m4a", ".flac"}),
+    "video": frozenset({".mp4", ".mov", ".avi", ".mkv"}),
+}
 
 class VideoProcessingApp:
     def __init__(self):
@@ -10,6 +19,7 @@ class VideoProcessingApp:
         self.video_enhancer = VideoEnhancer()
         self.video_merger = VideoMerger()
         self.av_merger = VideoAudioMerger()
+        self.gpu_pipeline = GpuColorPipeline() if GpuColorPipeline.available() else None
 
     # -------- Utility Functions --------
     def get_valid_path(self, prompt, expected_type):
@@ -22,11 +32,8 @@ class VideoProcessingApp:
 
             # Type validation
             ext = os.path.splitext(path)[1].lower()
-            if expected_type == "audio" and ext not in [".mp3", ".wav", ".m4a", ".flac"]:
-                print("⚠️ That’s not an audio file! Please provide a valid audio format.")
-                continue
-            if expected_type == "video" and ext not in [".mp4", ".mov", ".avi", ".mkv"]:
-                print("⚠️ That’s not a video file! Please provide a valid video format.")
+            if ext not in _EXTS[expected_type]:
+                print(f"⚠️ That’s not a valid {expected_type} file! Please provide a valid {expected_type} format.")
                 continue
 
             confirm = input(f"✅ Confirm file: {path} ? (y/n): ").strip().lower()
@@ -96,10 +103,10 @@ class VideoProcessingApp:
 
             try:
                 if choice == "1":
-                    out = self.video_enhancer.adjust_color(video_path, brightness=0.1, contrast=1.2, saturation=1.3, save=True)
+                    out = self.video_enhancer.adjust_color(video_path, brightness=0.1, contrast=1.2, saturation=1.3, save=True, fast=False)
                     print(f"✅ Saved: {out}")
                 elif choice == "2":
-                    out = self.video_enhancer.adjust_color(video_path, brightness=0.2, contrast=1.5, save=True)
+                    out = self.video_enhancer.adjust_color(video_path, brightness=0.2, contrast=1.5, save=True, fast=False)
                     print(f"✅ Saved: {out}")
                 else:
                     print("⚠️ Invalid choice.")
@@ -143,18 +150,67 @@ class VideoProcessingApp:
             print("Step 1️⃣: Decreasing volume...")
             processed_audio = self.audio_enhancer.decrease_volume(audio, db_reduce=-10.0, save=False)
 
-            print("Step 2️⃣: Enhancing video...")
-            processed_video = self.video_enhancer.adjust_color(video, brightness=0.1, contrast=1.2, saturation=1.3, save=False)
+            color = dict(brightness=0.1, contrast=1.2, saturation=1.3)
+            output = None
+
+            if self.gpu_pipeline is not None:
+                # decode -> color -> encode on the GPU; result is a file, so step 3 only stream-copies it
+                print("Step 2️⃣: Enhancing video on GPU...")
+                processed_video = self.gpu_pipeline.adjust_color(video, **color)
+                if processed_video is not None:
+                    print("Step 3️⃣: Combining audio + video...")
+                    try:
+                        output = self.av_merger.merge(processed_video, processed_audio, output_name="final_output.mp4", save=True)
+                    finally:
+                        os.remove(processed_video)
+
+            if output is None:
+                print("Step 2️⃣ + 3️⃣: Enhancing video and combining audio in one ffmpeg pass...")
+                output = self._fused_pipeline(video, processed_audio, output_name="final_output.mp4", **color)
 
-            print("Step 3️⃣: Combining audio + video...")
-            preferred_fps = getattr(processed_video, 'fps', 30)
-            output = self.av_merger.merge(processed_video, processed_audio, output_name="final_output.mp4", save=True, fps=preferred_fps)
+            if output is None:
+                print("Step 2️⃣: Enhancing video...")
+                processed_video = self.video_enhancer.adjust_color(video, save=False, **color)
+
+                print("Step 3️⃣: Combining audio + video...")
+                preferred_fps = getattr(processed_video, 'fps', 30)
+                output = self.av_merger.merge(processed_video, processed_audio, output_name="final_output.mp4", save=True, fps=preferred_fps)
 
             print(f"✅ Final video ready: {output}")
 
         except Exception as e:
             print(f"❌ Pipeline failed: {e}")
 
+    def _fused_pipeline(self, video, audio, brightness, contrast, saturation, output_name="final_output.mp4"):
+        """
+        Color-adjust, attach audio and encode in one decode -> kernel -> encode pass: adjust_color's
+        ffmpeg pipe with the new soundtrack mapped into its encoder, so the color math is the same
+        as every other adjust_color backend. The encoder is the merger's pick (NVENC when available).
+        `audio` may be a path or an in-memory (y, sr) pair, which is written to a temp wav first.
+        Returns the output path, or None if the pipe fails.
+        """
+        output = os.path.join(self.av_merger.output_dir, output_name)
+        temp_audio = None
+        try:
+            if isinstance(audio, tuple):
+                y, sr = audio
+                fd, temp_audio = tempfile.mkstemp(suffix=".wav", dir=self.av_merger.output_dir)
+                os.close(fd)
+                sf.write(temp_audio, y, sr)
+                audio = temp_audio
+
+            codec, codec_params = self.av_merger._video_codec()
+            return self.video_enhancer.adjust_color(
+                video, brightness, contrast, saturation, save=True, fast=False, audio_path=audio, output=output,
+                codec=codec, codec_params=codec_params,
+            )
+        except (OSError, RuntimeError, KeyError) as e:
+            print(f"⚠️ ffmpeg pipeline failed, falling back to MoviePy: {e}")
+            return None
+        finally:
+            if temp_audio and os.path.exists(temp_audio):
+                os.remove(temp_audio)
+
     # -------- Main Menu --------
     def run(self):
         while True:
@@ -0,0 +1,64 @@
+"""
+_kernels - ahead-of-time build of the hot audio/pixel loops
+
+Compiles the gain, fade-ramp and brightness/contrast/saturation kernels into a
+native `_native_kernels` extension next to this file, so they run at native
+speed with no JIT warm-up at import and without numba installed at runtime.
+
+Build once (needs numba and a C compiler):
+  python src/_kernels.py
+
+AudioEnhancer and VideoEnhancer import `_native_kernels` when it exists and
+fall back to their NumPy / numba / PIL paths when it doesn't.
+"""
+
+import os
+import numpy as np
+from numba.pycc import CC
+
+cc = CC("_native_kernels")
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+@cc.export("apply_gain", "void(f4[::1], f4)")
+def apply_gain(y, factor):
+    """y = clip(y * factor, -1, 1), in place."""
+    for i in range(y.size):
+        v = y[i] * factor
+        y[i] = min(1.0, max(-1.0, v))
+
+
+@cc.export("apply_ramp", "void(f4[::1], f4[:])")
+def apply_ramp(y, ramp):
+    """y *= ramp, in place (ramp may be a reversed view)."""
+    for i in range(y.size):
+        y[i] *= ramp[i]
+
+
+@cc.export("bcs", "void(u1[:, :, ::1], f8, f8, f8, u1[:, :, ::1])")
+def bcs(frame, brightness, contrast, saturation, out):
+    """PIL-equivalent Brightness -> Contrast -> Color, same math as videosetting._bcs (serial)."""
+    h, w = frame.shape[0], frame.shape[1]
+    total = 0.0
+    for y in range(h):
+        for x in range(w):
+            r = np.floor(min(frame[y, x, 0] * brightness, 255.0))
+            g = np.floor(min(frame[y, x, 1] * brightness, 255.0))
+            b = np.floor(min(frame[y, x, 2] * brightness, 255.0))
+            total += np.floor(0.299 * r + 0.587 * g + 0.114 * b + 0.5)
+    mean = float(int(total / (h * w) + 0.5))
+
+    for y in range(h):
+        for x in range(w):
+            c0 = np.floor(min(max(mean + contrast * (np.floor(min(frame[y, x, 0] * brightness, 255.0)) - mean), 0.0), 255.0))
+            c1 = np.floor(min(max(mean + contrast * (np.floor(min(frame[y, x, 1] * brightness, 255.0)) - mean), 0.0), 255.0))
+            c2 = np.floor(min(max(mean + contrast * (np.floor(min(frame[y, x, 2] * brightness, 255.0)) - mean), 0.0), 255.0))
+            gray = np.floor(0.299 * c0 + 0.587 * c1 + 0.114 * c2 + 0.5)
+            out[y, x, 0] = np.uint8(np.floor(min(max(gray + saturation * (c0 - gray), 0.0), 255.0)))
+            out[y, x, 1] = np.uint8(np.floor(min(max(gray + saturation * (c1 - gray), 0.0), 255.0)))
+            out[y, x, 2] = np.uint8(np.floor(min(max(gray + saturation * (c2 - gray), 0.0), 255.0)))
+
+
+if __name__ == "__main__":
+    cc.compile()
+    print("Built", os.path.join(cc.output_dir, cc.output_file))
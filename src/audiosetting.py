@@ -16,11 +16,20 @@ Features:
 
 import os
 import logging
+import functools
+import math
 import numpy as np
-import librosa
 import soundfile as sf
 from typing import List, Tuple, Optional, Union
 
+try:
+    from . import _native_kernels  # AOT-built by `python src/_kernels.py`
+except ImportError:
+    try:
+        import _native_kernels  # src/ itself on sys.path (tests, scripts)
+    except ImportError:
+        _native_kernels = None
+
 
 # ---------------- LOGGING ----------------
 logger = logging.getLogger("AudioEnhancerLibrosa")
@@ -31,6 +40,28 @@ if not logger.handlers:
 logger.setLevel(logging.INFO)
 
 
+# ---------------- HELPERS ----------------
+@functools.lru_cache(maxsize=16)
+def _ramp(n: int) -> np.ndarray:
+    """Cached float32 0->1 ramp of length n. Fade-out uses ramp[::-1] (a view). Read-only; never mutate."""
+    curve = np.linspace(0.0, 1.0, n, dtype=np.float32)
+    curve.flags.writeable = False
+    return curve
+
+
+def _is_f32_contig(y) -> bool:
+    """Arrays the native kernels may write in place: 1-D, C-contiguous, writable float32."""
+    return y.dtype == np.float32 and y.ndim == 1 and y.flags.c_contiguous and y.flags.writeable
+
+
+def _apply_ramp(seg: np.ndarray, ramp: np.ndarray) -> None:
+    """seg *= ramp in place; native kernel for contiguous float32, NumPy otherwise (which raises on a size mismatch)."""
+    if _native_kernels is not None and _is_f32_contig(seg) and seg.size == ramp.size:
+        _native_kernels.apply_ramp(seg, ramp)
+    else:
+        np.multiply(seg, ramp, out=seg)
+
+
 # ---------------- MAIN CLASS ----------------
 class AudioEnhancer:
     """Pure-Python audio processor using librosa (no FFmpeg needed)."""
@@ -38,146 +69,254 @@ class AudioEnhancer:
     def __init__(self, output_dir: str = "enhanced_audio"):
         self.output_dir = os.path.abspath(output_dir)
         os.makedirs(self.output_dir, exist_ok=True)
+        self._out_template = os.path.join(self.output_dir, "{base}_{suffix}.wav")
+        # base name of the last output path built; repeated saves from one file skip the path parsing
+        self._last_path = None
+        self._last_base = None
+
+    def _base(self, path: str) -> str:
+        if path != self._last_path:
+            self._last_path = path
+            self._last_base = os.path.splitext(os.path.basename(path))[0]
+        return self._last_base
 
     # Utility for naming output files
-    def _out(self, input_path: str, suffix: str) -> str:
-        base = os.path.splitext(os.path.basename(input_path))[0]
-        return os.path.join(self.output_dir, f"{base}_{suffix}.wav")
+    def _out(self, input_path: Union[str, Tuple], suffix: str) -> str:
+        base = self._base(input_path) if isinstance(input_path, str) else "audio"
+        return self._out_template.format(base=base, suffix=suffix)
 
     def _load(self, path: str):
-        y, sr = librosa.load(path, sr=None, mono=True)
+        try:
+            y, sr = sf.read(path, dtype="float32", always_2d=False)
+        except sf.LibsndfileError:
+            # formats libsndfile can't decode (e.g. m4a) go through librosa/audioread
+            import librosa
+            return librosa.load(path, sr=None, mono=True)
+        if y.ndim == 2:
+            y = y.mean(axis=1, dtype=np.float32)
+        return y, sr
+
+    def _load_slice(self, path: str, start: float, end: Optional[float]):
+        """Decode only [start, end) seconds of a file; falls back to a full load for formats libsndfile can't seek."""
+        try:
+            with sf.SoundFile(path) as f:
+                sr = f.samplerate
+                start_idx = min(int(start * sr), f.frames)
+                end_idx = min(int(end * sr), f.frames) if end else f.frames
+                f.seek(start_idx)
+                y = f.read(max(end_idx - start_idx, 0), dtype="float32", always_2d=False)
+        except sf.LibsndfileError:
+            y, sr = self._load(path)
+            return y[int(start * sr):int(end * sr) if end else len(y)], sr
+        if y.ndim == 2:
+            y = y.mean(axis=1, dtype=np.float32)
         return y, sr
 
+    def _reverse_to_file(self, path: str, out: str, block: int = 1 << 18) -> None:
+        """Write path reversed to out, reading block-sized chunks from the end so the whole file is never in RAM."""
+        with sf.SoundFile(path) as src, sf.SoundFile(out, "w", samplerate=src.samplerate, channels=1) as dst:
+            pos = src.frames
+            while pos > 0:
+                start = max(pos - block, 0)
+                src.seek(start)
+                chunk = src.read(pos - start, dtype="float32", always_2d=True)
+                dst.write(chunk.mean(axis=1, dtype=np.float32)[::-1])
+                pos = start
+
     def _save(self, y, sr, path: str):
         sf.write(path, y, sr)
 
     def _ensure_array(self, inp: Union[str, Tuple]) -> Tuple:
-        """If inp is a filepath, load it. If it's a (y,sr) tuple, return as-is."""
+        """
+        If inp is a filepath, load it. If it's a (y,sr) tuple, return a float32 copy of y:
+        the array kernels work in place, and the caller's array must not change under them.
+        """
         if isinstance(inp, tuple):
-            return inp
+            y, sr = inp
+            return np.array(y, dtype=np.float32), sr
         return self._load(inp)
 
+    def _apply_gain_db(self, y, db: float):
+        """Scale y by db decibels and clip to [-1, 1], in place (no temporaries)."""
+        factor = 10 ** (db / 20)
+        if _native_kernels is not None and _is_f32_contig(y):
+            _native_kernels.apply_gain(y, np.float32(factor))  # fused multiply+clip, one pass
+            return y
+        np.multiply(y, factor, out=y)
+        np.clip(y, -1.0, 1.0, out=y)
+        return y
+
+    # ---------------- ARRAY KERNELS ----------------
+    # Each takes (y, sr, val) and returns the resulting array (the same buffer when the op is in-place).
+    def _gain_array(self, y, sr: int, db: float):
+        return self._apply_gain_db(y, db)
+
+    def _fade_in_array(self, y, sr: int, duration: float):
+        n = int(sr * duration)
+        _apply_ramp(y[:n], _ramp(n))
+        return y
+
+    def _fade_out_array(self, y, sr: int, duration: float):
+        n = int(sr * duration)
+        _apply_ramp(y[-n:], _ramp(n)[::-1])
+        return y
+
+    def _time_stretch(self, y, sr: int, factor: float):
+        """Pitch-preserving stretch: native rubberband if available, librosa's phase vocoder otherwise."""
+        try:
+            import pyrubberband as pyrb
+            return pyrb.time_stretch(y, sr, factor).astype(np.float32, copy=False)
+        except (ImportError, RuntimeError) as e:
+            logger.debug("pyrubberband unavailable (%s), using librosa", e)
+        import librosa  # heavy import (numba); only this path needs it
+        return librosa.effects.time_stretch(y, rate=factor)
+
+    def _reverse_array(self, y, sr: int, _=None):
+        return y[::-1]
+
+    def _cut_array(self, y, sr: int, start: float, end: Optional[float] = None):
+        start_idx = int(start * sr)
+        end_idx = int(end * sr) if end else len(y)
+        return y[start_idx:end_idx]
+
+    def _normalize_array(self, y, sr: int, target_db: float):
+        flat = y.reshape(-1)
+        # sum of squares as one BLAS dot: no y**2 temporary
+        rms = math.sqrt(float(np.dot(flat, flat)) / flat.size)
+        current_db = 20 * math.log10(rms + 1e-6)
+        return self._apply_gain_db(y, target_db - current_db)
+
     # ---------------- CORE OPS ----------------
     def increase_volume(self, input_path: Union[str, Tuple], db_gain: float = 3.0, save: bool = False) -> Optional[Union[Tuple, str]]:
         """Increase volume. If save=False (default) returns (y,sr). If save=True writes file and returns path."""
         y, sr = self._ensure_array(input_path)
-        factor = 10 ** (db_gain / 20)
-        y_out = np.clip(y * factor, -1.0, 1.0)
+        y_out = self._apply_gain_db(y, db_gain)
         if save:
-            out = self._out(input_path if isinstance(input_path, str) else "audio", f"volup{db_gain}")
+            out = self._out(input_path, f"volup{db_gain}")
             self._save(y_out, sr, out)
             return out
         return y_out, sr
 
     def decrease_volume(self, input_path: Union[str, Tuple], db_reduce: float = -6.0, save: bool = False) -> Optional[Union[Tuple, str]]:
         y, sr = self._ensure_array(input_path)
-        factor = 10 ** (db_reduce / 20)
-        y_out = np.clip(y * factor, -1.0, 1.0)
+        y_out = self._apply_gain_db(y, db_reduce)
         if save:
-            out = self._out(input_path if isinstance(input_path, str) else "audio", f"voldown{abs(db_reduce)}")
+            out = self._out(input_path, f"voldown{abs(db_reduce)}")
             self._save(y_out, sr, out)
             return out
         return y_out, sr
 
     def fade_in(self, input_path: Union[str, Tuple], duration: float = 2.0, save: bool = False) -> Optional[Union[Tuple, str]]:
         y, sr = self._ensure_array(input_path)
-        n = int(sr * duration)
-        fade_curve = np.linspace(0.0, 1.0, n)
-        y[:n] = y[:n] * fade_curve
+        y = self._fade_in_array(y, sr, duration)
         if save:
-            out = self._out(input_path if isinstance(input_path, str) else "audio", f"fadein{duration}")
+            out = self._out(input_path, f"fadein{duration}")
             self._save(y, sr, out)
             return out
         return y, sr
 
     def fade_out(self, input_path: Union[str, Tuple], duration: float = 2.0, save: bool = False) -> Optional[Union[Tuple, str]]:
         y, sr = self._ensure_array(input_path)
-        n = int(sr * duration)
-        fade_curve = np.linspace(1.0, 0.0, n)
-        y[-n:] = y[-n:] * fade_curve
+        y = self._fade_out_array(y, sr, duration)
         if save:
-            out = self._out(input_path if isinstance(input_path, str) else "audio", f"fadeout{duration}")
+            out = self._out(input_path, f"fadeout{duration}")
             self._save(y, sr, out)
             return out
         return y, sr
 
-    def speed_change(self, input_path: Union[str, Tuple], factor: float = 1.25, save: bool = False) -> Optional[Union[Tuple, str]]:
+    def speed_change(self, input_path: Union[str, Tuple], factor: float = 1.25, save: bool = False, preserve_pitch: bool = True) -> Optional[Union[Tuple, str]]:
+        """Change playback speed. With preserve_pitch=False this is a plain soxr resample (pitch shifts, much faster)."""
         y, sr = self._ensure_array(input_path)
-        y_fast = librosa.effects.time_stretch(y, rate=factor)
+        if preserve_pitch:
+            y_fast = self._time_stretch(y, sr, factor)
+        else:
+            import soxr
+            y_fast = soxr.resample(y, sr, int(sr / factor))
         if save:
-            out = self._out(input_path if isinstance(input_path, str) else "audio", f"speed{factor}")
+            out = self._out(input_path, f"speed{factor}")
             self._save(y_fast, sr, out)
             return out
         return y_fast, sr
 
     def reverse(self, input_path: Union[str, Tuple], save: bool = False) -> Optional[Union[Tuple, str]]:
+        if save and isinstance(input_path, str):
+            out = self._out(input_path, "reversed")
+            try:
+                self._reverse_to_file(input_path, out)
+                return out
+            except sf.LibsndfileError:
+                pass  # not seekable by libsndfile: reverse in memory below
         y, sr = self._ensure_array(input_path)
-        y_rev = y[::-1]
+        y_rev = self._reverse_array(y, sr)
         if save:
-            out = self._out(input_path if isinstance(input_path, str) else "audio", "reversed")
+            out = self._out(input_path, "reversed")
             self._save(y_rev, sr, out)
             return out
         return y_rev, sr
 
     def cut(self, input_path: Union[str, Tuple], start: float = 0.0, end: Optional[float] = None, save: bool = False) -> Optional[Union[Tuple, str]]:
-        y, sr = self._ensure_array(input_path)
-        start_idx = int(start * sr)
-        end_idx = int(end * sr) if end else len(y)
-        y_cut = y[start_idx:end_idx]
+        if isinstance(input_path, str):
+            y_cut, sr = self._load_slice(input_path, start, end)
+        else:
+            y, sr = input_path
+            y_cut = self._cut_array(y, sr, start, end)
         if save:
-            out = self._out(input_path if isinstance(input_path, str) else "audio", f"cut{start}-{end or 'end'}")
+            out = self._out(input_path, f"cut{start}-{end or 'end'}")
             self._save(y_cut, sr, out)
             return out
         return y_cut, sr
 
     def normalize(self, input_path: Union[str, Tuple], target_db: float = -1.0, save: bool = False) -> Optional[Union[Tuple, str]]:
         y, sr = self._ensure_array(input_path)
-        rms = np.sqrt(np.mean(y ** 2))
-        current_db = 20 * np.log10(rms + 1e-6)
-        gain = target_db - current_db
-        factor = 10 ** (gain / 20)
-        y_norm = np.clip(y * factor, -1.0, 1.0)
+        y_norm = self._normalize_array(y, sr, target_db)
         if save:
-            out = self._out(input_path if isinstance(input_path, str) else "audio", f"norm{int(target_db)}dB")
+            out = self._out(input_path, f"norm{int(target_db)}dB")
             self._save(y_norm, sr, out)
             return out
         return y_norm, sr
 
     # ---------------- PIPELINE ----------------
+    # action name -> (array kernel, default arg used when the action's arg is None)
+    _PIPELINE_OPS = {
+        "increase_volume": ("_gain_array", 3.0),
+        "decrease_volume": ("_gain_array", -6.0),
+        "fade_in": ("_fade_in_array", 2.0),
+        "fade_out": ("_fade_out_array", 2.0),
+        "speed_change": ("_time_stretch", 1.25),
+        "reverse": ("_reverse_array", None),
+        "cut": ("_cut_array", 0.0),
+        "normalize": ("_normalize_array", -1.0),
+    }
+
+    def compile_pipeline(self, actions: List[Tuple[str, object]]) -> Optional[List[Tuple[str, object, object]]]:
+        """Resolve (method_name, arg) actions to (name, array kernel, arg) once. Returns None on an unknown action."""
+        compiled = []
+        for name, val in actions:
+            if name not in self._PIPELINE_OPS:
+                logger.error("Unknown action: %s", name)
+                return None
+            kernel, default = self._PIPELINE_OPS[name]
+            compiled.append((name, getattr(self, kernel), default if val is None else val))
+        return compiled
+
     def apply_multiple(self, input_path: Union[str, Tuple], actions: List[Tuple[str, object]], save: bool = False) -> Optional[Union[Tuple, str]]:
         """
         Apply multiple actions in sequence. Each action is (method_name, arg) where arg may be None.
         If save=False (default) this returns an in-memory (y,sr) tuple. If save=True, writes final file and returns path.
         """
-        temp = input_path
-        intermediate_files = []
-        try:
-            for name, val in actions:
-                fn = getattr(self, name, None)
-                if not fn:
-                    logger.error("Unknown action: %s", name)
-                    return None
-                logger.info("Applying: %s (%s)", name, val)
-                if val is None:
-                    res = fn(temp, save=False)
-                else:
-                    # If action is a numeric/primitive param, pass as keyword where appropriate
-                    # Most methods accept (input, param, save=False)
-                    res = fn(temp, val, save=False)
-                if not res:
-                    logger.error("Action failed: %s", name)
-                    return None
-                temp = res
-            if save:
-                # write final result
-                y, sr = self._ensure_array(temp)
-                out = self._out(input_path if isinstance(input_path, str) else "audio", "pipeline")
-                self._save(y, sr, out)
-                return out
-            return temp
-        finally:
-            # no accidental deletes; intermediate files are not created unless user requested save True earlier
-            pass
+        compiled = self.compile_pipeline(actions)
+        if compiled is None:
+            return None
+        # one buffer threaded through every stage; no (y, sr) re-packing in between
+        y, sr = self._ensure_array(input_path)
+        for name, fn, val in compiled:
+            logger.info("Applying: %s (%s)", name, val)
+            y = fn(y, sr, val)
+        if save:
+            out = self._out(input_path, "pipeline")
+            self._save(y, sr, out)
+            return out
+        return y, sr
 
 
 # ---------------- DEMO ----------------
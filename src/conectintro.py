@@ -11,6 +11,7 @@ Features:
 import os
 import logging
 from typing import Optional, Union
+import numpy as np
 from moviepy.editor import VideoFileClip, concatenate_videoclips
 from moviepy.video.VideoClip import VideoClip
 # ---- Pillow / MoviePy compatibility fix ----
@@ -24,6 +25,11 @@ if not hasattr(Image, "ANTIALIAS"):
 from moviepy.editor import VideoFileClip, concatenate_videoclips
 import logging
 
+try:
+    import cv2  # optional: SIMD resize, much faster than PIL LANCZOS
+except ImportError:
+    cv2 = None
+
 # ---------------- LOGGING ----------------
 logger = logging.getLogger("VideoMergerLite")
 if not logger.handlers:
@@ -56,7 +62,19 @@ class VideoMerger:
         Converts everything to 720p 30fps for consistency.
         """
         target_resolution = (1280, 720)
-        return clip.resize(newsize=target_resolution).set_fps(30)
+        fps = getattr(clip, "fps", None)
+        if tuple(clip.size) == target_resolution and fps is not None and abs(fps - 30) < 1e-3:
+            return clip
+        if tuple(clip.size) != target_resolution:
+            if cv2 is not None and clip.mask is None:
+                # INTER_AREA when shrinking, bilinear when enlarging
+                interp = cv2.INTER_AREA if clip.w > target_resolution[0] else cv2.INTER_LINEAR
+                clip = clip.fl_image(
+                    lambda frame: cv2.resize(np.asarray(frame, dtype=np.uint8), target_resolution, interpolation=interp)
+                )
+            else:
+                clip = clip.resize(newsize=target_resolution)
+        return clip.set_fps(30)
 
     def merge(self, intro_path: Union[str, VideoClip], main_path: Union[str, VideoClip], crossfade: float = 0.0, save: bool = False) -> Optional[Union[str, VideoClip]]:
         try:
@@ -84,7 +102,8 @@ class VideoMerger:
                 )
             else:
                 logger.info("🧩 Simple concatenation...")
-                merged_clip = concatenate_videoclips([intro_clip, main_clip], method="compose")
+                # both clips are 1280x720 after _normalize: no compositing needed
+                merged_clip = concatenate_videoclips([intro_clip, main_clip], method="chain")
 
             output = self._out("final_merged")
             logger.info("💾 Exporting merged video to %s", output)
@@ -0,0 +1,198 @@
+"""
+GpuColorPipeline - NVDEC -> CUDA color adjust -> NVENC, never leaving vRAM
+
+Used by the full pipeline when VPF (PyNvCodec) and pycuda are installed.
+Frames are decoded into GPU surfaces, color-adjusted in place by a small
+CUDA kernel and handed straight to the hardware encoder, so no frame is
+ever copied to host memory.
+
+Dependencies (optional):
+  VideoProcessingFramework (PyNvCodec), pycuda
+"""
+
+import os
+import logging
+import subprocess
+import tempfile
+from typing import Optional
+
+import numpy as np
+from moviepy.config import get_setting
+
+try:
+    import PyNvCodec as nvc
+    import pycuda.driver as cuda
+    from pycuda.compiler import SourceModule
+except ImportError:  # no GPU stack -> callers use the MoviePy path
+    nvc = None
+    cuda = None
+    SourceModule = None
+
+
+# ---------------- LOGGING ----------------
+logger = logging.getLogger("GpuColorPipeline")
+if not logger.handlers:
+    h = logging.StreamHandler()
+    h.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(message)s"))
+    logger.addHandler(h)
+logger.setLevel(logging.INFO)
+
+
+# Same math as PIL's ImageEnhance Brightness -> Contrast -> Color chain used by
+# VideoEnhancer.adjust_color (and its _bcs kernel): every stage is clamped and
+# truncated to uint8, luma is rounded. Pass 1 sums the luma after brightness
+# (the contrast pivot), reduced per block so only one atomic per block hits
+# the counter; pass 2 applies all three enhancements in one read/write.
+_BLOCK = (16, 16, 1)
+_KERNEL_SRC = r"""
+#define BLOCK_THREADS 256
+
+__device__ __forceinline__ float u8(float v) { return floorf(fminf(fmaxf(v, 0.0f), 255.0f)); }
+__device__ __forceinline__ float luma(float r, float g, float b) { return floorf(0.299f * r + 0.587f * g + 0.114f * b + 0.5f); }
+
+__global__ void luma_sum(const unsigned char* rgb, int pitch, int width, int height,
+                         float brightness, unsigned long long* acc)
+{
+    __shared__ unsigned int partial[BLOCK_THREADS];
+    int x = blockIdx.x * blockDim.x + threadIdx.x;
+    int y = blockIdx.y * blockDim.y + threadIdx.y;
+    int tid = threadIdx.y * blockDim.x + threadIdx.x;
+
+    unsigned int v = 0;
+    if (x < width && y < height) {
+        const unsigned char* p = rgb + y * pitch + x * 3;
+        v = (unsigned int)luma(u8(p[0] * brightness), u8(p[1] * brightness), u8(p[2] * brightness));
+    }
+    partial[tid] = v;
+    __syncthreads();
+
+    for (int stride = BLOCK_THREADS / 2; stride > 0; stride >>= 1) {
+        if (tid < stride) partial[tid] += partial[tid + stride];
+        __syncthreads();
+    }
+    if (tid == 0) atomicAdd(acc, (unsigned long long)partial[0]);
+}
+
+__global__ void adjust_color(unsigned char* rgb, int pitch, int width, int height,
+                             float brightness, float contrast, float saturation, float mean)
+{
+    int x = blockIdx.x * blockDim.x + threadIdx.x;
+    int y = blockIdx.y * blockDim.y + threadIdx.y;
+    if (x >= width || y >= height) return;
+    unsigned char* p = rgb + y * pitch + x * 3;
+    float c[3];
+    for (int i = 0; i < 3; ++i) {
+        c[i] = u8(mean + contrast * (u8(p[i] * brightness) - mean));
+    }
+    float gray = luma(c[0], c[1], c[2]);
+    for (int i = 0; i < 3; ++i) {
+        p[i] = (unsigned char)u8(gray + saturation * (c[i] - gray));
+    }
+}
+"""
+
+
+# ---------------- MAIN CLASS ----------------
+class GpuColorPipeline:
+    """Decode, color-adjust and encode a video entirely on the GPU."""
+
+    def __init__(self, output_dir: str = "enhanced_videos", gpu_id: int = 0):
+        self.output_dir = os.path.abspath(output_dir)
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.gpu_id = gpu_id
+
+    @staticmethod
+    def available() -> bool:
+        """True when VPF and pycuda imported and a CUDA device is visible."""
+        if nvc is None:
+            return False
+        try:
+            cuda.init()
+            return cuda.Device.count() > 0
+        except Exception:
+            return False
+
+    def adjust_color(self, input_path: str, brightness: float = 1.0, contrast: float = 1.0, saturation: float = 1.0) -> Optional[str]:
+        """
+        Color-adjust input_path on the GPU and write a silent mp4 to a temp file in output_dir.
+        The file is an intermediate for the audio merge, so it doesn't take VideoEnhancer's
+        <base>_color_adj.mp4 name; the caller removes it once merged.
+        Returns the temp path, or None if any GPU step fails (caller falls back to MoviePy).
+        """
+        base = os.path.splitext(os.path.basename(input_path))[0]
+        fd, output = tempfile.mkstemp(prefix=f"{base}_gpu_", suffix=".mp4", dir=self.output_dir)
+        os.close(fd)
+        raw_path = os.path.splitext(output)[0] + ".h264"
+
+        ctx = None
+        try:
+            cuda.init()
+            ctx = cuda.Device(self.gpu_id).retain_primary_context()
+            ctx.push()
+            stream = cuda.Stream()
+            module = SourceModule(_KERNEL_SRC)
+            luma_sum = module.get_function("luma_sum")
+            adjust = module.get_function("adjust_color")
+
+            decoder = nvc.PyNvDecoder(input_path, ctx.handle, stream.handle)
+            w, h, fps = decoder.Width(), decoder.Height(), decoder.Framerate()
+            cc = nvc.ColorspaceConversionContext(nvc.ColorSpace.BT_601, nvc.ColorRange.MPEG)
+            to_rgb = nvc.PySurfaceConverter(w, h, nvc.PixelFormat.NV12, nvc.PixelFormat.RGB, ctx.handle, stream.handle)
+            to_yuv = nvc.PySurfaceConverter(w, h, nvc.PixelFormat.RGB, nvc.PixelFormat.YUV420, ctx.handle, stream.handle)
+            to_nv12 = nvc.PySurfaceConverter(w, h, nvc.PixelFormat.YUV420, nvc.PixelFormat.NV12, ctx.handle, stream.handle)
+            encoder = nvc.PyNvEncoder(
+                {"preset": "P4", "codec": "h264", "s": f"{w}x{h}", "fps": str(round(fps))},
+                ctx.handle, stream.handle,
+            )
+
+            block = _BLOCK
+            grid = ((w + block[0] - 1) // block[0], (h + block[1] - 1) // block[1])
+            acc = cuda.mem_alloc(8)
+            enc_frame = np.ndarray(shape=(0,), dtype=np.uint8)
+            host_acc = np.zeros(1, dtype=np.uint64)
+
+            logger.info("🚀 GPU color pipeline: %dx%d @ %.2f fps", w, h, fps)
+            with open(raw_path, "wb") as raw:
+                while True:
+                    nv12 = decoder.DecodeSingleSurface()
+                    if nv12.Empty():
+                        break
+                    rgb = to_rgb.Execute(nv12, cc)
+                    plane = rgb.PlanePtr()
+                    ptr, pitch = np.uintp(plane.GpuMem()), np.int32(plane.Pitch())
+
+                    cuda.memset_d8_async(acc, 0, 8, stream)
+                    luma_sum(ptr, pitch, np.int32(w), np.int32(h), np.float32(brightness), acc,
+                             block=block, grid=grid, stream=stream)
+                    cuda.memcpy_dtoh_async(host_acc, acc, stream)
+                    stream.synchronize()
+                    mean = np.float32(int(host_acc[0] / (w * h) + 0.5))
+
+                    adjust(ptr, pitch, np.int32(w), np.int32(h), np.float32(brightness),
+                           np.float32(contrast), np.float32(saturation), mean,
+                           block=block, grid=grid, stream=stream)
+
+                    out_surf = to_nv12.Execute(to_yuv.Execute(rgb, cc), cc)
+                    if encoder.EncodeSingleSurface(out_surf, enc_frame):
+                        raw.write(bytearray(enc_frame))
+
+                while encoder.FlushSinglePacket(enc_frame):
+                    raw.write(bytearray(enc_frame))
+
+            # Raw H.264 has no timestamps: wrap it in mp4 at the source frame rate.
+            subprocess.run(
+                [get_setting("FFMPEG_BINARY"), "-y", "-loglevel", "error", "-r", str(fps),
+                 "-i", raw_path, "-c:v", "copy", output],
+                check=True, capture_output=True,
+            )
+            return output
+
+        except Exception as e:
+            logger.error("❌ GPU color pipeline failed: %s", e)
+            os.remove(output)
+            return None
+        finally:
+            if ctx is not None:
+                ctx.pop()
+            if os.path.exists(raw_path):
+                os.remove(raw_path)
@@ -1,15 +1,118 @@
 import os
 import logging
-from typing import Union, Tuple
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Union, Tuple, Optional
+import numpy as np
+import soundfile as sf
+from moviepy.config import get_setting
 from moviepy.editor import VideoFileClip, AudioFileClip, concatenate_audioclips
 from moviepy.video.VideoClip import VideoClip
 from moviepy.audio.AudioClip import AudioArrayClip
 
+try:
+    import ffmpegcv  # optional: NVDEC decode
+except (ImportError, RuntimeError):  # RuntimeError: ffmpegcv found no ffmpeg on PATH
+    ffmpegcv = None
+
+
+class _NvDecClip(VideoClip):
+    """
+    Video-only MoviePy clip whose frames are decoded on NVDEC by ffmpegcv.
+    Frames are read sequentially (the writer asks for them in order); asking for
+    an earlier time reopens the capture, like MoviePy's own FFMPEG reader does.
+    """
+
+    def __init__(self, path: str):
+        self.filename = path
+        self._cap = None
+        self._open()
+        self.fps = self._cap.fps
+        VideoClip.__init__(self, make_frame=self._make_frame, duration=self._cap.count / self.fps)
+
+    def _open(self):
+        if self._cap is not None:
+            self._cap.release()
+        self._cap = ffmpegcv.VideoCaptureNV(self.filename, pix_fmt="rgb24")
+        self._pos = -1
+        self._last = None
+
+    def _make_frame(self, t):
+        idx = int(t * self.fps + 1e-6)
+        if idx < self._pos:
+            self._open()
+        while self._pos < idx:
+            ok, frame = self._cap.read()
+            if not ok:
+                break  # past the last frame: keep repeating it
+            self._last = frame
+            self._pos += 1
+        return self._last
+
+    def close(self):
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
 class VideoAudioMerger:
+    # Probed once per process: does the bundled ffmpeg have a working h264_nvenc?
+    _nvenc_available = None
+
     def __init__(self, output_dir="output_videos"):
         self.output_dir = output_dir
         os.makedirs(self.output_dir, exist_ok=True)
         logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+        self.ffmpeg = get_setting("FFMPEG_BINARY")
+        if VideoAudioMerger._nvenc_available is None:
+            VideoAudioMerger._nvenc_available = self._detect_nvenc()
+
+    def _detect_nvenc(self) -> bool:
+        """Return True if ffmpeg lists h264_nvenc and can actually open it (i.e. a GPU is present)."""
+        try:
+            encoders = subprocess.run([self.ffmpeg, "-hide_banner", "-encoders"], capture_output=True, text=True, timeout=15).stdout
+            if "h264_nvenc" not in encoders:
+                return False
+            probe = subprocess.run(
+                [self.ffmpeg, "-hide_banner", "-loglevel", "error", "-f", "lavfi", "-i", "color=c=black:s=256x256:d=0.1",
+                 "-c:v", "h264_nvenc", "-f", "null", "-"],
+                capture_output=True, timeout=30,
+            )
+            return probe.returncode == 0
+        except (OSError, subprocess.SubprocessError):
+            return False
+
+    def _open_video(self, path: str) -> VideoClip:
+        """Open a video file for decoding: NVDEC via ffmpegcv when it works, MoviePy otherwise."""
+        if ffmpegcv is not None:
+            try:
+                return _NvDecClip(path)
+            except Exception as e:
+                logging.info(f"NVDEC decode unavailable ({e}), using MoviePy.")
+        return VideoFileClip(path)
+
+    def _video_codec(self):
+        """Pick (codec, ffmpeg_params) for re-encoding an in-memory clip: NVENC when available, else libx264."""
+        if self._nvenc_available:
+            return "h264_nvenc", ["-preset", "p4", "-rc", "vbr", "-cq", "23"]
+        return "libx264", None
+
+    def _stream_copy(self, video_path: str, audio_path: str, output_path: str) -> None:
+        """
+        Attach audio to a video file without touching the video pixels.
+        The video stream is copied as-is and only the audio is encoded to AAC.
+        Audio is looped when shorter and cut by -shortest when longer, matching the MoviePy path.
+        """
+        cmd = [
+            self.ffmpeg, "-y", "-loglevel", "error",
+            "-i", video_path,
+            "-stream_loop", "-1", "-i", audio_path,
+            "-map", "0:v:0", "-map", "1:a:0",
+            "-c:v", "copy", "-c:a", "aac", "-b:a", "192k",
+            "-shortest", output_path,
+        ]
+        subprocess.run(cmd, check=True, capture_output=True)
 
     def merge(self, video_input: Union[str, VideoFileClip], audio_input: Union[str, AudioFileClip, Tuple], output_name: str = "merged_video.mp4", save: bool = False, fps: int = None) -> Union[str, VideoFileClip]:
         """
@@ -19,9 +122,23 @@ class VideoAudioMerger:
         """
 
         try:
+            # --- Fast path: untouched video file on disk -> stream copy, no re-encode ---
+            if save and isinstance(video_input, str) and not isinstance(audio_input, AudioFileClip):
+                output_path = os.path.join(self.output_dir, output_name)
+                if self._try_stream_copy(video_input, audio_input, output_path):
+                    logging.info(f"✅ Merged video created successfully (stream copy): {output_path}")
+                    return output_path
+
+            # --- In-memory video: encode audio on a worker thread while the video renders ---
+            if save and isinstance(video_input, VideoClip) and isinstance(audio_input, (str, tuple, AudioFileClip)):
+                output_path = os.path.join(self.output_dir, output_name)
+                if self._try_parallel_encode(video_input, audio_input, output_path, fps):
+                    logging.info(f"✅ Merged video created successfully: {output_path}")
+                    return output_path
+
             # --- Validate Inputs ---
             # --- Load Files ---
-            video = video_input if isinstance(video_input, VideoClip) else VideoFileClip(video_input)
+            video = video_input if isinstance(video_input, VideoClip) else self._open_video(video_input)
 
             if isinstance(audio_input, tuple):
                 # (y, sr) numpy array pair
@@ -47,8 +164,18 @@ class VideoAudioMerger:
                 # Loop audio to match video length
                 loop_count = int(v_dur // a_dur) + 1
                 logging.info(f"Audio shorter → looping {loop_count}x to fit video.")
-                audio_clips = [audio] * loop_count
-                audio = concatenate_audioclips(audio_clips).subclip(0, v_dur)
+                if isinstance(audio, (AudioArrayClip, AudioFileClip)):
+                    # tile the samples once (np.resize repeats) instead of chaining loop_count clips
+                    # (to_soundarray() hands np.vstack a generator, which numpy 2 rejects; stack the chunks ourselves)
+                    samples = audio.array if isinstance(audio, AudioArrayClip) else np.vstack(list(audio.iter_chunks(fps=audio.fps, chunksize=50000)))
+                    looped = np.resize(samples, (int(v_dur * audio.fps), samples.shape[1]))
+                    looped_audio = AudioArrayClip(looped, fps=audio.fps)
+                    if audio is not audio_input:
+                        audio.close()
+                    audio = looped_audio
+                else:
+                    audio_clips = [audio] * loop_count
+                    audio = concatenate_audioclips(audio_clips).subclip(0, v_dur)
 
             elif a_dur > v_dur:
                 # Trim audio to match video
@@ -61,7 +188,10 @@ class VideoAudioMerger:
             # --- Export or return clip ---
             output_path = os.path.join(self.output_dir, output_name)
             if save:
-                write_kwargs = dict(codec="libx264", audio_codec="aac", threads=4, verbose=False, logger=None)
+                codec, ffmpeg_params = self._video_codec()
+                write_kwargs = dict(codec=codec, audio_codec="aac", threads=4, verbose=False, logger=None)
+                if ffmpeg_params:
+                    write_kwargs['ffmpeg_params'] = ffmpeg_params
                 if fps is not None:
                     write_kwargs['fps'] = fps
                 final_video.write_videofile(output_path, **write_kwargs)
@@ -84,6 +214,108 @@ class VideoAudioMerger:
             logging.error(f"❌ Merge failed: {e}")
             return None
 
+    def _try_stream_copy(self, video_path: str, audio_input: Union[str, Tuple], output_path: str) -> bool:
+        """Run the stream-copy merge. Returns False (so the caller re-encodes with MoviePy) if ffmpeg refuses."""
+        if not os.path.exists(video_path):
+            raise FileNotFoundError(f"Video file not found: {video_path}")
+
+        audio_path, temp_audio = self._audio_file(audio_input)
+        try:
+            self._stream_copy(video_path, audio_path, output_path)
+            return True
+        except subprocess.CalledProcessError as e:
+            logging.warning(f"Stream copy failed, falling back to re-encode: {e.stderr.decode(errors='ignore').strip()}")
+            return False
+        finally:
+            self._remove(temp_audio)
+
+    def _try_parallel_encode(self, video: VideoClip, audio_input: Union[str, AudioFileClip, Tuple], output_path: str, fps: Optional[int]) -> bool:
+        """
+        Render an in-memory clip with the audio transcode running concurrently.
+        ffmpeg encodes the (looped/trimmed) audio to AAC on a worker thread while MoviePy writes a
+        silent video; a final -c copy pass muxes them. Returns False if the audio job fails.
+        """
+        temp_audio = temp_aac = temp_video = temp_clip_audio = None
+        try:
+            if isinstance(audio_input, AudioFileClip):
+                if self._is_untouched_file(audio_input):
+                    audio_input = audio_input.filename
+                else:
+                    # subclip / effects live only in the clip: render them, don't re-read the file
+                    temp_clip_audio = self._temp_path(".wav")
+                    audio_input.write_audiofile(temp_clip_audio, fps=audio_input.fps, verbose=False, logger=None)
+                    audio_input = temp_clip_audio
+            audio_path, temp_audio = self._audio_file(audio_input)
+            temp_aac = self._temp_path(".m4a")
+            temp_video = self._temp_path(".mp4")
+            with ThreadPoolExecutor(max_workers=1) as pool:
+                audio_job = pool.submit(self._encode_audio, audio_path, video.duration, temp_aac)
+
+                codec, ffmpeg_params = self._video_codec()
+                write_kwargs = dict(codec=codec, audio=False, threads=4, verbose=False, logger=None)
+                if ffmpeg_params:
+                    write_kwargs['ffmpeg_params'] = ffmpeg_params
+                if fps is not None:
+                    write_kwargs['fps'] = fps
+                video.write_videofile(temp_video, **write_kwargs)
+
+                audio_job.result()
+
+            subprocess.run(
+                [self.ffmpeg, "-y", "-loglevel", "error", "-i", temp_video, "-i", temp_aac,
+                 "-map", "0:v:0", "-map", "1:a:0", "-c", "copy", "-shortest", output_path],
+                check=True, capture_output=True,
+            )
+            video.close()
+            return True
+        except subprocess.CalledProcessError as e:
+            logging.warning(f"Parallel audio encode failed, falling back to MoviePy: {e.stderr.decode(errors='ignore').strip()}")
+            return False
+        finally:
+            self._remove(temp_audio, temp_aac, temp_video, temp_clip_audio)
+
+    @staticmethod
+    def _is_untouched_file(audio: AudioFileClip) -> bool:
+        """True for an AudioFileClip exactly as loaded: no subclip, time shift or effect applied."""
+        reader = getattr(audio, "reader", None)
+        return (
+            reader is not None
+            and audio.start == 0
+            and abs(audio.duration - reader.duration) < 1e-3
+            and audio.make_frame.__qualname__.startswith("AudioFileClip.__init__")
+        )
+
+    def _encode_audio(self, audio_path: str, duration: float, output_path: str) -> None:
+        """Transcode audio to AAC, looped or cut to exactly `duration` seconds."""
+        subprocess.run(
+            [self.ffmpeg, "-y", "-loglevel", "error", "-stream_loop", "-1", "-i", audio_path,
+             "-t", f"{duration:.3f}", "-vn", "-c:a", "aac", "-b:a", "192k", output_path],
+            check=True, capture_output=True,
+        )
+
+    def _audio_file(self, audio_input: Union[str, Tuple]) -> Tuple[str, Optional[str]]:
+        """Return a path ffmpeg can read for audio_input, plus the temp wav to delete afterwards (or None)."""
+        if isinstance(audio_input, tuple):
+            # (y, sr) numpy array pair -> write a temporary wav ffmpeg can read
+            y, sr = audio_input
+            temp_audio = self._temp_path(".wav")
+            sf.write(temp_audio, y, sr)
+            return temp_audio, temp_audio
+        if not os.path.exists(audio_input):
+            raise FileNotFoundError(f"Audio file not found: {audio_input}")
+        return audio_input, None
+
+    def _temp_path(self, suffix: str) -> str:
+        fd, path = tempfile.mkstemp(suffix=suffix, dir=self.output_dir)
+        os.close(fd)
+        return path
+
+    @staticmethod
+    def _remove(*paths: Optional[str]) -> None:
+        for path in paths:
+            if path and os.path.exists(path):
+                os.remove(path)
+
 
 # Example Usage:
 if __name__ == "__main__":
@@ -13,25 +13,504 @@ Features:
 """
 
 import os
+import logging
+import functools
+import subprocess
+import weakref
 from typing import Optional, Union
 from moviepy.editor import (
-    VideoFileClip, CompositeVideoClip, vfx, TextClip, AudioFileClip
+    VideoFileClip, CompositeVideoClip, vfx, TextClip, AudioFileClip, ImageClip
 )
+from moviepy.config import get_setting
 from moviepy.video.VideoClip import VideoClip
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
 import numpy as np
-from PIL import Image, ImageEnhance
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba is optional; adjust_color falls back to NumPy
+    njit = None
+
+try:
+    from . import _native_kernels  # AOT-built by `python src/_kernels.py`
+except ImportError:
+    try:
+        import _native_kernels  # src/ itself on sys.path (tests, scripts)
+    except ImportError:
+        _native_kernels = None
+
+try:
+    import cv2
+except ImportError:  # OpenCV is optional
+    cv2 = None
+
+try:
+    import cupy as cp
+except ImportError:  # CuPy is optional; only used with VideoEnhancer(device="cuda")
+    cp = None
+
+_CUDA_OK = False
+if cv2 is not None:
+    try:
+        _CUDA_OK = cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except (AttributeError, cv2.error):  # OpenCV built without CUDA
+        pass
+
+
+# ---------------- LOGGING ----------------
+logger = logging.getLogger("VideoEnhancer")
+if not logger.handlers:
+    h = logging.StreamHandler()
+    h.setFormatter(logging.Formatter("%(asctime)s | %(levelname)s | %(message)s"))
+    logger.addHandler(h)
+logger.setLevel(logging.INFO)
+
+
+# ---------------- KERNELS ----------------
+# ITU-R 601 luma weights (what PIL's convert("L") uses)
+_LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+if njit is not None:
+    @njit(inline="always", fastmath=True)
+    def _u8(v):
+        """
+        Truncate and saturate to [0, 255] like PIL's Image.blend does between enhancement stages.
+        Branch-free on int32: the sign-bit masks clip below 0, then above 255.
+        """
+        x = np.int32(v)
+        x &= ~(x >> 31)
+        over = 255 - x
+        return 255 - (over & ~(over >> 31))
+
+    @njit(inline="always", fastmath=True)
+    def _luma(r, g, b):
+        """PIL's rounded ITU-R 601 luma (convert("L"))."""
+        return np.floor(0.299 * r + 0.587 * g + 0.114 * b + 0.5)
+
+    @njit(parallel=True, fastmath=True)
+    def _bcs(frame, brightness, contrast, saturation, out):
+        """
+        Fused PIL-equivalent Brightness -> Contrast -> Color on a uint8 RGB frame.
+        One reduction pass for the contrast pivot (mean luma after brightness), then a
+        single read/write pass for all three enhancements.
+        """
+        h, w = frame.shape[0], frame.shape[1]
+        row_sums = np.empty(h, dtype=np.float64)
+        for y in prange(h):
+            acc = 0.0
+            for x in range(w):
+                r = _u8(frame[y, x, 0] * brightness)
+                g = _u8(frame[y, x, 1] * brightness)
+                b = _u8(frame[y, x, 2] * brightness)
+                acc += _luma(r, g, b)
+            row_sums[y] = acc
+        mean = float(int(row_sums.sum() / (h * w) + 0.5))
+
+        for y in prange(h):
+            for x in range(w):
+                r = _u8(mean + contrast * (_u8(frame[y, x, 0] * brightness) - mean))
+                g = _u8(mean + contrast * (_u8(frame[y, x, 1] * brightness) - mean))
+                b = _u8(mean + contrast * (_u8(frame[y, x, 2] * brightness) - mean))
+                gray = _luma(r, g, b)
+                out[y, x, 0] = np.uint8(_u8(gray + saturation * (r - gray)))
+                out[y, x, 1] = np.uint8(_u8(gray + saturation * (g - gray)))
+                out[y, x, 2] = np.uint8(_u8(gray + saturation * (b - gray)))
+        return out
+else:
+    _bcs = None
+
+
+def _color_coeffs(contrast: float, saturation: float):
+    """
+    Contrast -> Color composed into one affine map per pixel of the brightened frame:
+    out = a*x + b*gray + mean*pivot, with gray the pixel's luma and mean the frame's
+    contrast pivot (mean luma after brightness, as PIL computes it). Only mean varies per frame.
+    Brightness is applied (and saturated) as its own step first, like PIL's Brightness stage;
+    only the clip between Contrast and Color is dropped.
+    """
+    return contrast * saturation, contrast * (1.0 - saturation), 1.0 - contrast
+
+
+def _cv2_color(frame, brightness: float, coeffs, out):
+    """
+    OpenCV (SIMD) Brightness -> Contrast -> Color: a saturating scale into `out` for brightness,
+    then a single saturating addWeighted with its gray image; coeffs come from _color_coeffs.
+    addWeighted clips negative values to 0 (convertScaleAbs would mirror dark pixels under
+    contrast > 1; for the brightness scale alpha is never negative).
+    """
+    a, b, pivot = coeffs
+    cv2.convertScaleAbs(frame, dst=out, alpha=brightness)
+    gray = cv2.cvtColor(out, cv2.COLOR_RGB2GRAY)
+    mean = float(int(cv2.mean(gray)[0] + 0.5))
+    gray3 = cv2.cvtColor(gray, cv2.COLOR_GRAY2RGB)
+    cv2.addWeighted(out, a, gray3, b, mean * pivot, dst=out)
+    return out
+
+
+def _atempo_chain(factor: float) -> str:
+    """ffmpeg audio filter for a `factor` (> 0) tempo change; atempo takes 0.5..2.0 per stage, so chain stages."""
+    if factor <= 0:
+        raise ValueError(f"tempo factor must be > 0, got {factor}")
+    stages = []
+    while factor > 2.0:
+        stages.append(2.0)
+        factor /= 2.0
+    while factor < 0.5:
+        stages.append(0.5)
+        factor /= 0.5
+    stages.append(factor)
+    return ",".join(f"atempo={f}" for f in stages)
+
+
+@functools.lru_cache(maxsize=64)
+def _render_text_rgba(text: str, fontsize: int, color: str, stroke_color=None, bg_color="transparent", size=None):
+    """
+    Render text once through TextClip (an ImageMagick subprocess) and cache the bitmap:
+    returns (rgb uint8 HxWx3, alpha float HxW). Read-only; never mutate.
+    """
+    txt = TextClip(text, fontsize=fontsize, color=color, stroke_color=stroke_color, bg_color=bg_color, size=size)
+    rgb = np.array(txt.get_frame(0), dtype=np.uint8)
+    alpha = np.array(txt.mask.get_frame(0)) if txt.mask is not None else np.ones(rgb.shape[:2])
+    txt.close()
+    rgb.flags.writeable = False
+    alpha.flags.writeable = False
+    return rgb, alpha
+
+
+def _text_clip(text: str, duration: float, pos, **style) -> ImageClip:
+    """ImageClip (with mask) over the cached text bitmap; stands in for a fresh TextClip."""
+    rgb, alpha = _render_text_rgba(text, **style)
+    return (
+        ImageClip(rgb)
+        .set_mask(ImageClip(alpha, ismask=True))
+        .set_duration(duration)
+        .set_pos(pos)
+    )
+
+
+class _CudaColorAdjust:
+    """
+    cv2.cuda version of the Brightness -> Contrast -> Color chain for one clip.
+    Keeps a single CUDA stream and the device buffers alive across frames so
+    each frame costs one upload, a few kernels and one download.
+    """
+
+    def __init__(self, brightness: float, contrast: float, saturation: float):
+        self.brightness = float(brightness)
+        self.coeffs = _color_coeffs(contrast, saturation)
+        self.stream = cv2.cuda.Stream()
+        self.src = cv2.cuda_GpuMat()
+        self.bright = cv2.cuda_GpuMat()
+
+    def __call__(self, frame):
+        s = self.stream
+        a, b, pivot = self.coeffs
+        self.src.upload(np.ascontiguousarray(frame, dtype=np.uint8), s)
+        self.src.convertTo(cv2.CV_8UC3, self.brightness, 0.0, s, self.bright)
+
+        # contrast pivots around the mean luma of the brightened frame (as PIL does)
+        gray = cv2.cuda.cvtColor(self.bright, cv2.COLOR_RGB2GRAY, stream=s)
+        s.waitForCompletion()
+        h, w = frame.shape[:2]
+        mean = float(int(cv2.cuda.sum(gray)[0] / (h * w) + 0.5))
+
+        gray3 = cv2.cuda.cvtColor(gray, cv2.COLOR_GRAY2RGB, stream=s)
+        out = cv2.cuda.addWeighted(self.bright, a, gray3, b, mean * pivot, stream=s)
+        result = out.download(s)
+        s.waitForCompletion()
+        return result
+
+
+class _CupyColorAdjust:
+    """
+    CuPy version of the fused color map for one clip: one elementwise CUDA kernel per frame
+    that saturates x*brightness, then applies out = a*x + b*gray + mean*pivot (see _color_coeffs). Host frames go through pinned staging
+    buffers, reused along with the device buffers for every frame of the same size
+    (the returned frame too, unless reuse_output=False).
+    """
+
+    _kernel = None
+
+    def __init__(self, brightness: float, contrast: float, saturation: float, reuse_output: bool = True):
+        if _CupyColorAdjust._kernel is None:
+            _CupyColorAdjust._kernel = cp.ElementwiseKernel(
+                "uint8 r, uint8 g, uint8 b, float32 K, float32 A, float32 B, float32 C",
+                "uint8 ro, uint8 go, uint8 bo",
+                """
+                float rk = floorf(fminf(fmaxf(r * K, 0.0f), 255.0f));
+                float gk = floorf(fminf(fmaxf(g * K, 0.0f), 255.0f));
+                float bk = floorf(fminf(fmaxf(b * K, 0.0f), 255.0f));
+                float gray = 0.299f * rk + 0.587f * gk + 0.114f * bk;
+                ro = (unsigned char)fminf(fmaxf(A * rk + B * gray + C, 0.0f), 255.0f);
+                go = (unsigned char)fminf(fmaxf(A * gk + B * gray + C, 0.0f), 255.0f);
+                bo = (unsigned char)fminf(fmaxf(A * bk + B * gray + C, 0.0f), 255.0f);
+                """,
+                "bcs_affine",
+            )
+        self.brightness = float(brightness)
+        self.coeffs = _color_coeffs(contrast, saturation)
+        self.reuse_output = reuse_output
+        self.shape = None
+
+    def _alloc(self, shape):
+        self.shape = shape
+        nbytes = int(np.prod(shape))
+        self.host_in = np.frombuffer(cp.cuda.alloc_pinned_memory(nbytes), np.uint8, nbytes).reshape(shape)
+        self.host_out = np.frombuffer(cp.cuda.alloc_pinned_memory(nbytes), np.uint8, nbytes).reshape(shape)
+        self.src = cp.empty(shape, dtype=cp.uint8)
+        self.dst = cp.empty(shape, dtype=cp.uint8)
+
+    def __call__(self, frame):
+        if frame.shape != self.shape:
+            self._alloc(frame.shape)
+        a, b, pivot = self.coeffs
+        np.copyto(self.host_in, frame)
+        self.src.set(self.host_in)
+        d = self.src
+        # contrast pivots around the mean luma of the brightened frame (as PIL does)
+        db = cp.floor(cp.clip(d * np.float32(self.brightness), 0.0, 255.0))
+        luma = float((0.299 * db[..., 0] + 0.587 * db[..., 1] + 0.114 * db[..., 2]).mean())
+        mean = float(int(luma + 0.5))
+        self._kernel(d[..., 0], d[..., 1], d[..., 2], np.float32(self.brightness),
+                     np.float32(a), np.float32(b), np.float32(mean * pivot),
+                     self.dst[..., 0], self.dst[..., 1], self.dst[..., 2])
+        return self.dst.get(out=self.host_out) if self.reuse_output else self.dst.get()
 
 
 class VideoEnhancer:
     """Pure Python + MoviePy video processor."""
 
-    def __init__(self, output_dir: str = "enhanced_videos"):
+    def __init__(self, output_dir: str = "enhanced_videos", device: str = "cpu"):
         self.output_dir = os.path.abspath(output_dir)
         os.makedirs(self.output_dir, exist_ok=True)
+        self.ffmpeg = get_setting("FFMPEG_BINARY")
+        if device == "cuda" and cp is None:
+            logger.warning("⚠ CuPy not installed, using CPU color kernels")
+            device = "cpu"
+        self.device = device
+        # clips opened on the caller's behalf and still alive (see _track / close); weak, so a
+        # dropped save=False result and its source are still garbage-collected as before
+        self._open_clips = weakref.WeakSet()
+        # libx264 settings on every encode: all cores, and a fast preset for intermediate renders
+        # (fast=True, the default) or medium/CRF 20 for final output (fast=False).
+        # MoviePy emits -preset/-threads itself from write_videofile's arguments (see _write_args).
+        self._threads = 0
+        self._preset, self._preset_final = "superfast", "medium"
+        self._ffmpeg_params, self._ffmpeg_params_final = [], ["-crf", "20"]
+        # float32 work buffers for the NumPy color kernel, (re)allocated on the first frame of each size
+        self._scratch_f32 = None
+        self._scratch_gray = None
+        if _bcs is not None and self.device != "cuda" and not _CUDA_OK and cv2 is None:
+            # numba kernel is what adjust_color will pick: pay its compile here, not on the first frame
+            dummy = np.zeros((2, 2, 3), dtype=np.uint8)
+            _bcs(dummy, 1.0, 1.0, 1.0, np.empty_like(dummy))
 
-    def _out(self, input_path: str, suffix: str, ext="mp4") -> str:
+    # ---------------- CLIP LIFETIME ----------------
+    def _track(self, clip):
+        """Register a clip this enhancer opened so close() / the with-block can release it."""
+        self._open_clips.add(clip)
+        return clip
+
+    def _open(self, input_path: Union[str, VideoClip]) -> VideoClip:
+        """Caller's clip as-is; paths are opened (one ffmpeg reader each) and tracked."""
+        if isinstance(input_path, VideoClip):
+            return input_path
+        return self._track(VideoFileClip(input_path))
+
+    def _close(self, *clips) -> None:
+        """Close clips (ffmpeg readers, audio procs) and stop tracking them. Closing twice is harmless."""
+        for clip in clips:
+            clip.close()
+            self._open_clips.discard(clip)
+
+    def close(self) -> None:
+        """Close every clip still open from save=False calls (sources, text overlays, audio)."""
+        self._close(*list(self._open_clips))
+
+    def __enter__(self) -> "VideoEnhancer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    @staticmethod
+    @functools.lru_cache(maxsize=256)
+    def _out_cached(output_dir: str, input_path: str, suffix: str, ext: str) -> str:
         base = os.path.splitext(os.path.basename(input_path))[0]
-        return os.path.join(self.output_dir, f"{base}_{suffix}.{ext}")
+        return os.path.join(output_dir, f"{base}_{suffix}.{ext}")
+
+    def _out(self, input_path: str, suffix: str, ext="mp4") -> str:
+        return self._out_cached(self.output_dir, input_path, suffix, ext)
+
+    def _fast_color_kernel(self, frame, brightness: float, contrast: float, saturation: float, out=None):
+        """
+        NumPy Brightness -> Contrast -> Color without PIL images: x is scaled by brightness and
+        saturated to uint8 levels as PIL's first stage does, then one fused affine pass
+        out = c*(s*x + (1-s)*gray) + mean*(1-c), where gray is the pixel's luma and mean the
+        contrast pivot (mean luma after brightness). Unlike PIL it doesn't clip between
+        Contrast and Color.
+        Accepts one (H, W, 3) frame or a (N, H, W, 3) batch (one pivot per frame).
+        Writes into `out` (uint8, frame-shaped) when given.
+        """
+        if self._scratch_f32 is None or self._scratch_f32.shape != frame.shape:
+            self._scratch_f32 = np.empty(frame.shape, dtype=np.float32)
+            self._scratch_gray = np.empty(frame.shape[:-1], dtype=np.float32)
+        buf, gray = self._scratch_f32, self._scratch_gray
+
+        a, b, pivot = _color_coeffs(contrast, saturation)
+        np.multiply(frame, np.float32(brightness), out=buf)
+        np.clip(buf, 0.0, 255.0, out=buf)
+        np.floor(buf, out=buf)
+        np.matmul(buf, _LUMA, out=gray)
+        mean = np.floor(gray.mean(axis=(-2, -1)) + 0.5)
+
+        np.multiply(buf, a, out=buf)
+        np.multiply(gray, b, out=gray)
+        np.add(buf, gray[..., None], out=buf)
+        np.add(buf, (mean * pivot)[..., None, None, None], out=buf)
+        np.clip(buf, 0.0, 255.0, out=buf)
+        if out is None:
+            return buf.astype(np.uint8)
+        np.copyto(out, buf, casting="unsafe")
+        return out
+
+    @staticmethod
+    def _as_uint8(clip: VideoClip) -> VideoClip:
+        """
+        Decoded files already yield C-contiguous uint8 RGB and are returned as-is. Generated
+        clips may not (ColorClip frames are int64, effects such as fadein give floats in 0-255,
+        masks floats in 0-1); the conversion for those is picked once per clip instead of per frame.
+        """
+        first = clip.get_frame(0)
+        if first.dtype == np.uint8 and first.flags.c_contiguous:
+            return clip
+        if getattr(clip, "ismask", False):
+            return clip.fl_image(lambda frame: (np.clip(frame, 0.0, 1.0) * 255).astype(np.uint8))
+        if np.issubdtype(first.dtype, np.floating):
+            return clip.fl_image(lambda frame: np.clip(frame, 0, 255).astype(np.uint8))
+        return clip.fl_image(lambda frame: np.ascontiguousarray(frame, dtype=np.uint8))
+
+    def _batched_fl_image(self, clip: VideoClip, kernel, batch: int = 16) -> VideoClip:
+        """
+        Like clip.fl_image, but `kernel` gets a (n, H, W, 3) uint8 batch of up to `batch`
+        consecutive frames at once and returns the processed batch. Frames are gathered into
+        one buffer allocated on the first call; sequential readers (writers, previews) then
+        hit the processed batch for the next batch-1 frames.
+        """
+        fps = clip.fps
+        buf = None
+        result = None
+        start = count = 0
+
+        def fl(gf, t):
+            nonlocal buf, result, start, count
+            i = int(t * fps + 1e-6)  # floor, as MoviePy's reader maps t to a frame
+            if result is None or not start <= i < start + count:
+                first = gf(t)
+                if buf is None or buf.shape[1:] != np.shape(first):
+                    buf = np.empty((batch,) + np.shape(first), dtype=np.uint8)
+                buf[0] = first
+                n = 1
+                while n < batch and (clip.duration is None or (i + n) / fps < clip.duration):
+                    buf[n] = gf((i + n) / fps)
+                    n += 1
+                result = kernel(buf[:n])
+                start, count = i, n
+            return result[i - start]
+
+        return clip.fl(fl, apply_to=[])
+
+    def _encoder_params(self, fast: bool = True) -> list:
+        """x264 options for the encoders this class runs itself (pipes, ffmpeg filter runs)."""
+        preset, params = (self._preset, self._ffmpeg_params) if fast else (self._preset_final, self._ffmpeg_params_final)
+        return ["-threads", str(self._threads), "-preset", preset, *params]
+
+    def _write_args(self, fast: bool = True) -> dict:
+        """The same settings as write_videofile keyword arguments."""
+        if fast:
+            return dict(preset=self._preset, threads=self._threads, ffmpeg_params=self._ffmpeg_params)
+        return dict(preset=self._preset_final, threads=self._threads, ffmpeg_params=self._ffmpeg_params_final)
+
+    def _pipe_process(self, input_path: str, kernel, output: str, batch: int = 1, pix_fmt: str = "rgb24",
+                      codec: str = "libx264", audio_codec: str = "aac", fast: bool = True,
+                      audio_path: Optional[str] = None, codec_params: Optional[list] = None, **enc_args) -> str:
+        """
+        Stream input_path through `kernel` (uint8 RGB frame -> frame) with two ffmpeg processes:
+        one decoding to raw rgb24 on stdout, one encoding raw rgb24 from stdin. No per-frame
+        MoviePy dispatch; the source audio is copied across by the encoder (re-encoded to audio_codec).
+        With batch > 1 frames are read `batch` at a time and kernel gets a (n, H, W, 3) batch.
+        With pix_fmt="yuv420p" the kernel gets each planar frame as a (H*3/2, W) array instead:
+        H rows of Y, then the U and V planes (raises ValueError for odd frame sizes).
+        With audio_path the output takes its audio from that file instead, looped or cut to the video.
+        codec_params replaces the x264 preset/CRF options for other encoders (e.g. h264_nvenc, which
+        also decodes with -hwaccel cuda); with codec_params=None a non-x264 codec gets no extra options.
+        Extra enc_args become encoder options, e.g. preset="fast" -> -preset fast.
+        """
+        infos = ffmpeg_parse_infos(input_path)
+        w, h = infos["video_size"]
+        if infos.get("video_rotation", 0) in (90, 270):  # ffmpeg autorotates on decode
+            w, h = h, w
+        fps = infos["video_fps"]
+        if pix_fmt == "yuv420p":
+            if w % 2 or h % 2:
+                raise ValueError(f"yuv420p pipe needs an even frame size, got {w}x{h}")
+            shape = (h * 3 // 2, w)
+        else:
+            shape = (h, w, 3)
+        frame_bytes = int(np.prod(shape))
+
+        hwaccel = ["-hwaccel", "cuda"] if codec.endswith("_nvenc") else []
+        decode = [self.ffmpeg, "-loglevel", "error", *hwaccel, "-i", input_path,
+                  "-f", "rawvideo", "-pix_fmt", pix_fmt, "-"]
+        encode = [self.ffmpeg, "-y", "-loglevel", "error",
+                  "-f", "rawvideo", "-pix_fmt", pix_fmt, "-s", f"{w}x{h}", "-r", str(fps), "-i", "-",
+                  "-c:v", codec, "-pix_fmt", "yuv420p", "-c:a", audio_codec]
+        if audio_path is None:
+            encode[encode.index("-c:v"):encode.index("-c:v")] = ["-i", input_path, "-map", "0:v:0", "-map", "1:a:0?"]
+        else:
+            encode[encode.index("-c:v"):encode.index("-c:v")] = ["-stream_loop", "-1", "-i", audio_path,
+                                                                 "-map", "0:v:0", "-map", "1:a:0", "-shortest"]
+        if codec_params is not None:
+            encode += codec_params
+        elif codec == "libx264":
+            encode += self._encoder_params(fast)
+        for key, value in enc_args.items():
+            encode += [f"-{key}", str(value)]
+        encode.append(output)
+
+        src = subprocess.Popen(decode, stdout=subprocess.PIPE, bufsize=1 << 20)
+        dst = subprocess.Popen(encode, stdin=subprocess.PIPE, bufsize=1 << 20)
+        # one read buffer for the whole stream; frames are np.frombuffer views on it and the
+        # kernel's output goes back out as a memoryview, so no per-frame bytes objects
+        buf = bytearray(frame_bytes * batch)
+        view = memoryview(buf)
+        try:
+            while True:
+                got = 0
+                while got < len(buf):
+                    r = src.stdout.readinto(view[got:])
+                    if not r:
+                        break
+                    got += r
+                n = got // frame_bytes
+                if n == 0:
+                    break
+                frames = np.frombuffer(buf, dtype=np.uint8, count=n * frame_bytes)
+                if batch == 1:
+                    out = kernel(frames.reshape(shape))
+                else:
+                    out = kernel(frames.reshape((n,) + shape))
+                dst.stdin.write(memoryview(np.ascontiguousarray(out)).cast("B"))
+                if n < batch:
+                    break
+        finally:
+            src.stdout.close()
+            dst.stdin.close()
+            src.wait()
+            dst.wait()
+        if src.returncode != 0 or dst.returncode != 0:
+            raise RuntimeError(f"ffmpeg pipe failed for {input_path} (decode={src.returncode}, encode={dst.returncode})")
+        return output
 
     # ---------------- FILTERS ----------------
     def adjust_color(
@@ -41,113 +520,253 @@ class VideoEnhancer:
         contrast: float = 1.0,
         saturation: float = 1.0,
         save: bool = False,
+        fast: bool = True,
+        audio_path: Optional[str] = None,
+        output: Optional[str] = None,
+        codec: str = "libx264",
+        codec_params: Optional[list] = None,
     ) -> Optional[Union[str, VideoFileClip]]:
-        """Adjust brightness/contrast/saturation. Returns VideoFileClip when save=False, else writes file and returns path."""
-        clip = input_path if isinstance(input_path, VideoClip) else VideoFileClip(input_path)
+        """
+        Adjust brightness/contrast/saturation. Returns VideoFileClip when save=False, else writes file and returns path.
+        For a path input with save=True, audio_path replaces the soundtrack in the same encode (and makes
+        pipe failures raise rather than fall back), output overrides the output file path, and
+        codec/codec_params pick the pipe's video encoder (e.g. VideoAudioMerger._video_codec()).
+        """
+        # When saving, one output buffer per clip is reused for every frame: the writer (or the
+        # encode pipe) is done with a frame before asking for the next one. A clip returned to
+        # the caller gets a fresh array per frame, since callers may keep frames around.
+        out_buf = None
+
+        def output_for(arr):
+            nonlocal out_buf
+            if not save:
+                return np.empty_like(arr)
+            if out_buf is None or out_buf.shape != arr.shape:
+                out_buf = np.empty_like(arr)
+            return out_buf
+
+        # The kernels take uint8 RGB frames as decoders produce them; other dtypes are
+        # converted once per clip below, not checked on every frame.
+        def process_frame_fused(frame):
+            return _bcs(frame, float(brightness), float(contrast), float(saturation), output_for(frame))
+
+        coeffs = _color_coeffs(contrast, saturation)
+
+        def process_frame_cv2(frame):
+            return _cv2_color(frame, brightness, coeffs, output_for(frame))
+
+        def process_frame_native(frame):
+            out = output_for(frame)
+            _native_kernels.bcs(frame, float(brightness), float(contrast), float(saturation), out)
+            return out
 
         def process_frame(frame):
-            arr = np.asarray(frame)
-            # Ensure we have uint8 RGB data for PIL
-            if arr.dtype != np.uint8:
-                # If values are in [0,1], scale up
-                if arr.max() <= 1.0:
-                    arr = (arr * 255).astype(np.uint8)
-                else:
-                    arr = arr.astype(np.uint8)
-            img = Image.fromarray(arr)
-            img = ImageEnhance.Brightness(img).enhance(brightness)
-            img = ImageEnhance.Contrast(img).enhance(contrast)
-            img = ImageEnhance.Color(img).enhance(saturation)
-            return np.array(img)
-
-        new_clip = clip.fl_image(process_frame)
+            return self._fast_color_kernel(frame, brightness, contrast, saturation, out=output_for(frame))
+
+        if self.device == "cuda":
+            kernel = _CupyColorAdjust(brightness, contrast, saturation, reuse_output=save)
+        elif _CUDA_OK:
+            kernel = _CudaColorAdjust(brightness, contrast, saturation)
+        elif cv2 is not None:
+            kernel = process_frame_cv2
+        elif _bcs is not None:
+            kernel = process_frame_fused
+        elif _native_kernels is not None:
+            kernel = process_frame_native
+        else:
+            kernel = process_frame
+        # Saturation 1 leaves the chain as one per-pixel affine map x -> cb*x + mean*(1-c) on all
+        # three channels, which in limited-range YCbCr is Y -> cb*(Y-16) + 16 + off and
+        # U, V -> cb*(U-128) + 128: two 256-entry lookup tables, no RGB conversion at all.
+        cb = brightness * contrast
+        levels = np.arange(256, dtype=np.float64)
+        uv_lut = np.rint(np.clip(cb * (levels - 128.0) + 128.0, 16.0, 240.0)).astype(np.uint8)
+
+        def process_frame_yuv(frame):
+            out = output_for(frame)
+            h = frame.shape[0] * 2 // 3
+            mean_luma = (float(frame[:h].mean()) - 16.0) * 255.0 / 219.0
+            mean = float(int(min(brightness * mean_luma, 255.0) + 0.5))
+            y_off = 16.0 + mean * (1.0 - contrast) * 219.0 / 255.0
+            y_lut = np.rint(np.clip(cb * (levels - 16.0) + y_off, 16.0, 235.0)).astype(np.uint8)
+            np.take(y_lut, frame[:h], out=out[:h])
+            np.take(uv_lut, frame[h:], out=out[h:])
+            return out
+
+        # only the NumPy kernel is dispatch-bound enough to gain from taking frames 16 at a time
+        batch = 16 if kernel is process_frame else 1
+
+        if save and isinstance(input_path, str):
+            # file in, file out: pipe raw frames between ffmpeg processes instead of fl_image
+            output = output or self._out(input_path, "color_adj")
+            try:
+                if saturation == 1.0:
+                    try:
+                        return self._pipe_process(input_path, process_frame_yuv, output, pix_fmt="yuv420p",
+                                                  codec=codec, fast=fast, audio_path=audio_path,
+                                                  codec_params=codec_params)
+                    except ValueError:  # odd frame size: no 2x2 chroma grid, use the RGB pipe
+                        pass
+                return self._pipe_process(input_path, kernel, output, batch=batch, codec=codec, fast=fast,
+                                          audio_path=audio_path, codec_params=codec_params)
+            except (OSError, RuntimeError, KeyError) as e:
+                if audio_path is not None:  # the MoviePy path below can't swap the soundtrack
+                    raise
+                logger.warning("⚠ ffmpeg pipe failed (%s), falling back to MoviePy", e)
+
+        clip = self._open(input_path)
+        src = self._as_uint8(clip)
+        if batch > 1 and getattr(clip, "fps", None):
+            new_clip = self._batched_fl_image(src, kernel, batch)
+        else:
+            new_clip = src.fl_image(kernel)
         if save:
             output = self._out(input_path if isinstance(input_path, str) else getattr(input_path, 'filename', 'clip'), "color_adj")
-            new_clip.write_videofile(output, codec="libx264", audio_codec="aac")
-            clip.close()
-            new_clip.close()
+            new_clip.write_videofile(output, codec="libx264", audio_codec="aac", **self._write_args(fast))
+            self._close(clip, new_clip)
             return output
         # return clip object for in-memory pipeline
         # do not close source/new_clip here
         return new_clip
 
-    def speed_change(self, input_path: Union[str, VideoClip], factor: float = 1.25, save: bool = False) -> Optional[Union[str, VideoClip]]:
-        clip = input_path if isinstance(input_path, VideoClip) else VideoFileClip(input_path)
+    def speed_change(self, input_path: Union[str, VideoClip], factor: float = 1.25, save: bool = False, fast: bool = True) -> Optional[Union[str, VideoClip]]:
+        if factor <= 0:
+            raise ValueError(f"speed factor must be > 0, got {factor}")
+        if save and isinstance(input_path, str):
+            # file in, file out: one ffmpeg run with setpts/atempo, no per-frame Python time mapping
+            output = self._out(input_path, f"speed{factor}")
+            cmd = [self.ffmpeg, "-y", "-loglevel", "error", "-i", input_path, "-filter:v", f"setpts=PTS/{factor}"]
+            if ffmpeg_parse_infos(input_path).get("audio_found"):
+                cmd += ["-filter:a", _atempo_chain(factor), "-c:a", "aac"]
+            cmd += ["-c:v", "libx264", "-pix_fmt", "yuv420p", *self._encoder_params(fast), output]
+            subprocess.run(cmd, check=True, capture_output=True)
+            return output
+        clip = self._open(input_path)
         new_clip = clip.fx(vfx.speedx, factor)
         if save:
             output = self._out(input_path if isinstance(input_path, str) else getattr(input_path, 'filename', 'clip'), f"speed{factor}")
-            new_clip.write_videofile(output, codec="libx264", audio_codec="aac")
-            clip.close()
-            new_clip.close()
+            new_clip.write_videofile(output, codec="libx264", audio_codec="aac", **self._write_args(fast))
+            self._close(clip, new_clip)
             return output
         return new_clip
 
-    def fade_in_out(self, input_path: Union[str, VideoClip], fade_in: float = 1.0, fade_out: float = 1.0, save: bool = False) -> Optional[Union[str, VideoClip]]:
-        clip = input_path if isinstance(input_path, VideoClip) else VideoFileClip(input_path)
+    def fade_in_out(self, input_path: Union[str, VideoClip], fade_in: float = 1.0, fade_out: float = 1.0, save: bool = False, fast: bool = True) -> Optional[Union[str, VideoClip]]:
+        clip = self._open(input_path)
         new_clip = clip.crossfadein(fade_in).crossfadeout(fade_out)
         if save:
             output = self._out(input_path if isinstance(input_path, str) else getattr(input_path, 'filename', 'clip'), "fade")
-            new_clip.write_videofile(output, codec="libx264", audio_codec="aac")
-            clip.close()
-            new_clip.close()
+            new_clip.write_videofile(output, codec="libx264", audio_codec="aac", **self._write_args(fast))
+            self._close(clip, new_clip)
             return output
         return new_clip
 
-    def trim(self, input_path: Union[str, VideoClip], start: float = 0.0, end: Optional[float] = None, save: bool = False) -> Optional[Union[str, VideoClip]]:
-        clip = input_path if isinstance(input_path, VideoClip) else VideoFileClip(input_path)
+    def trim(self, input_path: Union[str, VideoClip], start: float = 0.0, end: Optional[float] = None, save: bool = False, fast: bool = True) -> Optional[Union[str, VideoClip]]:
+        clip = self._open(input_path)
         new_clip = clip.subclip(start, end)
         if save:
             output = self._out(input_path if isinstance(input_path, str) else getattr(input_path, 'filename', 'clip'), f"cut{start}-{end or 'end'}")
-            new_clip.write_videofile(output, codec="libx264", audio_codec="aac")
-            clip.close()
-            new_clip.close()
+            new_clip.write_videofile(output, codec="libx264", audio_codec="aac", **self._write_args(fast))
+            self._close(clip, new_clip)
             return output
         return new_clip
 
-    def add_watermark(self, input_path: Union[str, VideoClip], watermark_text: str = "Demo", pos=("right", "bottom"), save: bool = False) -> Optional[Union[str, VideoClip]]:
-        clip = input_path if isinstance(input_path, VideoClip) else VideoFileClip(input_path)
-        txt = (
-            TextClip(watermark_text, fontsize=40, color="white", stroke_color="black")
-            .set_duration(clip.duration)
-            .set_pos(pos)
-        )
+    def add_watermark(self, input_path: Union[str, VideoClip], watermark_text: str = "Demo", pos=("right", "bottom"), save: bool = False, fast: bool = True) -> Optional[Union[str, VideoClip]]:
+        clip = self._open(input_path)
+        txt = self._track(_text_clip(watermark_text, clip.duration, pos, fontsize=40, color="white", stroke_color="black"))
         final = CompositeVideoClip([clip, txt])
         if save:
             output = self._out(input_path if isinstance(input_path, str) else getattr(input_path, 'filename', 'clip'), "wm")
-            final.write_videofile(output, codec="libx264", audio_codec="aac")
-            clip.close()
-            final.close()
+            final.write_videofile(output, codec="libx264", audio_codec="aac", **self._write_args(fast))
+            self._close(clip, txt, final)
             return output
         return final
 
-    def add_subtitles(self, input_path: Union[str, VideoClip], text: str, save: bool = False) -> Optional[Union[str, VideoClip]]:
-        clip = input_path if isinstance(input_path, VideoClip) else VideoFileClip(input_path)
-        txt = (
-            TextClip(text, fontsize=35, color="white", bg_color="black", size=(clip.w, 80))
-            .set_duration(clip.duration)
-            .set_pos(("center", "bottom"))
-        )
+    def add_subtitles(self, input_path: Union[str, VideoClip], text: str, save: bool = False, fast: bool = True) -> Optional[Union[str, VideoClip]]:
+        clip = self._open(input_path)
+        txt = self._track(_text_clip(text, clip.duration, ("center", "bottom"), fontsize=35, color="white", bg_color="black", size=(clip.w, 80)))
         final = CompositeVideoClip([clip, txt])
         if save:
             output = self._out(input_path if isinstance(input_path, str) else getattr(input_path, 'filename', 'clip'), "subtitled")
-            final.write_videofile(output, codec="libx264", audio_codec="aac")
-            clip.close()
-            final.close()
+            final.write_videofile(output, codec="libx264", audio_codec="aac", **self._write_args(fast))
+            self._close(clip, txt, final)
             return output
         return final
 
     def extract_audio(self, input_path: Union[str, VideoClip], save: bool = False) -> Optional[Union[str, AudioFileClip]]:
         """Extract audio track. Returns MoviePy AudioFileClip when save=False, else writes mp3 and returns path."""
-        clip = input_path if isinstance(input_path, VideoClip) else VideoFileClip(input_path)
+        if isinstance(input_path, str):
+            # straight from the file: no video reader, and no Python-side audio chunks when saving
+            if not save:
+                return self._track(AudioFileClip(input_path))
+            output = self._out(input_path, "audio", "mp3")
+            subprocess.run(
+                [self.ffmpeg, "-y", "-loglevel", "error", "-i", input_path,
+                 "-vn", "-acodec", "libmp3lame", "-b:a", "192k", output],
+                check=True, capture_output=True,
+            )
+            return output
+        clip = input_path
         audio = clip.audio
         if save:
-            output = self._out(input_path if isinstance(input_path, str) else getattr(input_path, 'filename', 'clip'), "audio", "mp3")
+            output = self._out(getattr(input_path, 'filename', 'clip'), "audio", "mp3")
             audio.write_audiofile(output)
-            clip.close()
-            audio.close()
+            self._close(clip, audio)
             return output
         return audio
 
+    def pipeline(self, input_path: Union[str, VideoClip]) -> "VideoPipeline":
+        """Chain filters in memory and encode once: ve.pipeline(src).color(...).watermark(...).save()."""
+        return VideoPipeline(self, input_path)
+
+
+class VideoPipeline:
+    """
+    Builder over VideoEnhancer's filters. Every step runs with save=False on the current
+    clip, so chained filters cost one decode and one encode in total instead of one per step.
+    The source clip stays open until save().
+    """
+
+    def __init__(self, enhancer: VideoEnhancer, input_path: Union[str, VideoClip]):
+        self.enhancer = enhancer
+        self.name = input_path if isinstance(input_path, str) else getattr(input_path, 'filename', 'clip')
+        self.source = enhancer._open(input_path)
+        self.clip = self.source
+        self.steps = []
+
+    def _apply(self, step: str, method, *args, **kwargs) -> "VideoPipeline":
+        self.clip = method(self.clip, *args, save=False, **kwargs)
+        self.steps.append(step)
+        return self
+
+    def color(self, brightness: float = 1.0, contrast: float = 1.0, saturation: float = 1.0) -> "VideoPipeline":
+        return self._apply("color_adj", self.enhancer.adjust_color, brightness, contrast, saturation)
+
+    def speed(self, factor: float = 1.25) -> "VideoPipeline":
+        return self._apply(f"speed{factor}", self.enhancer.speed_change, factor)
+
+    def fade(self, fade_in: float = 1.0, fade_out: float = 1.0) -> "VideoPipeline":
+        return self._apply("fade", self.enhancer.fade_in_out, fade_in, fade_out)
+
+    def trim(self, start: float = 0.0, end: Optional[float] = None) -> "VideoPipeline":
+        return self._apply(f"cut{start}-{end or 'end'}", self.enhancer.trim, start, end)
+
+    def watermark(self, watermark_text: str = "Demo", pos=("right", "bottom")) -> "VideoPipeline":
+        return self._apply("wm", self.enhancer.add_watermark, watermark_text, pos)
+
+    def subtitles(self, text: str) -> "VideoPipeline":
+        return self._apply("subtitled", self.enhancer.add_subtitles, text)
+
+    def save(self, output: Optional[str] = None, fast: bool = False) -> str:
+        """
+        Encode the chained clip once, close it and the source, and return the output path.
+        This is usually the final render, so it defaults to the quality encoder settings.
+        """
+        if output is None:
+            output = self.enhancer._out(self.name, "_".join(self.steps) or "copy")
+        self.clip.write_videofile(output, codec="libx264", audio_codec="aac", **self.enhancer._write_args(fast))
+        self.enhancer._close(self.clip, self.source)
+        return output
+
 
 # ---------------- DEMO ----------------
 if __name__ == "__main__":
@@ -1,53 +1,85 @@
 import os
+import subprocess
 import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
 
 from audiosetting import AudioEnhancer
-from videosetting import VideoEnhancer
+from videosetting import VideoEnhancer, _atempo_chain
 from conectintro import VideoMerger
 from videomerger import VideoAudioMerger
 import numpy as np
-from moviepy.editor import ColorClip
+import soundfile as sf
+from moviepy.config import get_setting
+from moviepy.editor import ColorClip, CompositeVideoClip, VideoFileClip, AudioFileClip, vfx
+from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
 
 
-def run_smoke_test():
-    root = Path(__file__).resolve().parents[1]
-    out_dir = root / 'test_outputs'
-    (out_dir).mkdir(parents=True, exist_ok=True)
+SR = 22050
+
 
+def _tone():
     # tiny audio (1s sine)
-    sr = 22050
-    t = np.linspace(0, 1.0, int(sr * 1.0), endpoint=False)
-    y = (0.1 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    t = np.linspace(0, 1.0, int(SR * 1.0), endpoint=False)
+    return (0.1 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
 
-    A = AudioEnhancer(output_dir=str(out_dir / 'audio'))
-    V = VideoEnhancer(output_dir=str(out_dir / 'video'))
-    VM = VideoMerger(output_dir=str(out_dir / 'merged_videos'))
-    VAM = VideoAudioMerger(output_dir=str(out_dir / 'final_videos'))
 
-    results = {}
+def _clips(V):
+    # every worker builds its own clips: MoviePy clips (and their ffmpeg readers) are not shared across processes
+    clip = ColorClip(size=(320, 240), color=(255, 0, 0), duration=1).set_fps(24)
+    new_clip = V.adjust_color(clip, brightness=1.05, contrast=1.02, saturation=1.0, save=False)
+    return clip, new_clip
 
-    print('OUT_DIR:', out_dir)
+
+def _audio_stage(out_dir):
+    A = AudioEnhancer(output_dir=str(out_dir / 'audio'))
+    y = _tone()
+    results = {}
 
     print('1) Audio in-memory...')
-    a_y_sr = A.decrease_volume((y, sr), db_reduce=-6.0, save=False)
+    a_y_sr = A.decrease_volume((y, SR), db_reduce=-6.0, save=False)
     results['audio_inmem'] = isinstance(a_y_sr, tuple) and len(a_y_sr) == 2
 
     print('2) Audio save to file...')
-    a_path = A.decrease_volume((y, sr), db_reduce=-6.0, save=True)
+    a_path = A.decrease_volume((y, SR), db_reduce=-6.0, save=True)
     results['audio_saved_exists'] = Path(a_path).exists()
+    # -6 dB of a 0.1 peak tone (and the caller's y must not have been scaled by step 1)
+    saved, _ = sf.read(a_path)
+    results['audio_saved_level'] = abs(np.abs(saved).max() - 0.1 * 10 ** (-6.0 / 20)) < 1e-3
+    return results
+
+
+def _video_stage(out_dir):
+    V = VideoEnhancer(output_dir=str(out_dir / 'video'))
+    results = {}
 
     print('3) Video in-memory...')
-    clip = ColorClip(size=(320, 240), color=(255, 0, 0), duration=1).set_fps(24)
-    new_clip = V.adjust_color(clip, brightness=1.05, contrast=1.02, saturation=1.0, save=False)
+    clip, new_clip = _clips(V)
     results['video_inmem'] = hasattr(new_clip, 'duration')
 
     print('4) Video save to file...')
     video_path = V.adjust_color(clip, brightness=1.05, contrast=1.02, saturation=1.0, save=True)
     results['video_saved_exists'] = Path(video_path).exists()
 
+    print('4b) Float frames from a fade keep their 0-255 scale...')
+    faded = ColorClip((64, 48), color=(200, 100, 50), duration=2).set_fps(10).fx(vfx.fadein, 1)
+    pixel = V.adjust_color(faded, brightness=1.0, contrast=1.0, saturation=1.0).get_frame(1.5)[0, 0]
+    results['video_float_frames'] = np.abs(pixel.astype(int) - [200, 100, 50]).max() <= 1
+
+    clip.close()
+    new_clip.close()
+    return results
+
+
+def _merge_stage(out_dir):
+    V = VideoEnhancer(output_dir=str(out_dir / 'video'))
+    VM = VideoMerger(output_dir=str(out_dir / 'merged_videos'))
+    clip, new_clip = _clips(V)
+    results = {}
+
     print('5) Merge videos in-memory...')
     merged_clip = VM.merge(clip, new_clip, save=False)
     results['merge_inmem'] = hasattr(merged_clip, 'duration')
@@ -56,14 +88,252 @@ def run_smoke_test():
     merged_path = VM.merge(clip, new_clip, save=True)
     results['merge_saved_exists'] = Path(merged_path).exists()
 
+    for c in (clip, new_clip, merged_clip):
+        c.close()
+    return results
+
+
+def _attach_audio_stage(out_dir):
+    V = VideoEnhancer(output_dir=str(out_dir / 'video'))
+    VAM = VideoAudioMerger(output_dir=str(out_dir / 'final_videos'))
+    clip, new_clip = _clips(V)
+    y = _tone()
+    results = {}
+
     print('7) Attach audio in-memory...')
-    final_clip = VAM.merge(new_clip, (y, sr), save=False)
+    final_clip = VAM.merge(new_clip, (y, SR), save=False)
     results['va_inmem'] = hasattr(final_clip, 'duration')
 
     print('8) Final save...')
-    final_path = VAM.merge(new_clip, (y, sr), output_name='smoke_test_output.mp4', save=True, fps=24)
+    final_path = VAM.merge(new_clip, (y, SR), output_name='smoke_test_output.mp4', save=True, fps=24)
     results['va_saved_exists'] = Path(final_path).exists()
 
+    for c in (clip, new_clip, final_clip):
+        c.close()
+    return results
+
+
+def _normalize_stage(out_dir):
+    VM = VideoMerger(output_dir=str(out_dir / 'merged_videos'))
+    results = {}
+
+    print('13) Normalize skips clips already at 720p / 30 fps...')
+    ready = ColorClip(size=(1280, 720), color=(0, 255, 0), duration=1).set_fps(30)
+    no_fps = ColorClip(size=(1280, 720), color=(0, 255, 0), duration=1)
+    small = ColorClip(size=(640, 360), color=(0, 255, 0), duration=1).set_fps(24)
+    results['normalize_skip'] = VM._normalize(ready) is ready
+    results['normalize_sets_fps'] = VM._normalize(no_fps).fps == 30
+    resized = VM._normalize(small)
+    results['normalize_resize'] = tuple(resized.size) == (1280, 720) and resized.get_frame(0).shape == (720, 1280, 3)
+    return results
+
+
+def _chain_stage(out_dir):
+    VM = VideoMerger(output_dir=str(out_dir / 'merged_videos'))
+    results = {}
+
+    print('14) Plain concatenation chains the clips, no compositing...')
+    intro = ColorClip(size=(1280, 720), color=(255, 0, 0), duration=1).set_fps(30)
+    main = ColorClip(size=(1280, 720), color=(0, 0, 255), duration=1).set_fps(30)
+    merged = VM.merge(intro, main, save=False)
+    results['merge_chain'] = (
+        not isinstance(merged, CompositeVideoClip)
+        and abs(merged.duration - 2.0) < 1e-6
+        and tuple(merged.get_frame(0.5)[0, 0]) == (255, 0, 0)
+        and tuple(merged.get_frame(1.5)[0, 0]) == (0, 0, 255)
+    )
+    return results
+
+
+def _sources(tmp):
+    # 1 s tone wav and 1 s mp4 (ffmpeg's test pattern + a sine, so both tracks really are 1 s long)
+    wav = str(tmp / 'tone.wav')
+    sf.write(wav, _tone(), SR)
+    src = str(tmp / 'src.mp4')
+    subprocess.run(
+        [get_setting('FFMPEG_BINARY'), '-y', '-loglevel', 'error',
+         '-f', 'lavfi', '-i', 'testsrc=size=320x240:rate=24:duration=1',
+         '-f', 'lavfi', '-i', f'sine=frequency=440:sample_rate={SR}:duration=1',
+         '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-c:a', 'aac', '-shortest', src],
+        check=True, capture_output=True,
+    )
+    return wav, src, ffmpeg_parse_infos(src)['duration']
+
+
+def _stream_copy_stage(out_dir):
+    # path-in/path-out merge; scratch files only
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        VAM = VideoAudioMerger(output_dir=str(tmp))
+        wav, src, src_dur = _sources(tmp)
+
+        print('11) Stream-copy merge...')
+        merged = VAM.merge(src, wav, output_name='merged.mp4', save=True)
+        info = ffmpeg_parse_infos(merged)
+        return {'path_merge_stream_copy': info['audio_found'] and abs(info['duration'] - src_dur) < 0.1}
+
+
+def _audio_pipeline_stage(out_dir):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        A = AudioEnhancer(output_dir=str(tmp))
+        y = _tone()
+        wav = str(tmp / 'tone.wav')
+        sf.write(wav, y, SR)
+        actions = [('decrease_volume', -6.0), ('fade_in', 0.1), ('reverse', None)]
+        results = {}
+
+        print('15) Compiled audio pipeline...')
+        compiled = A.compile_pipeline(actions)
+        results['pipeline_compile'] = (
+            [name for name, _, _ in compiled] == [name for name, _ in actions]
+            and A.compile_pipeline([('no_such_op', None)]) is None
+        )
+        # same result as calling the methods one after another, and the caller's array untouched
+        expected, _ = A.reverse(A.fade_in(A.decrease_volume((y, SR), -6.0), 0.1))
+        chained, sr = A.apply_multiple((y, SR), actions)
+        results['pipeline_inmem'] = sr == SR and np.allclose(chained, expected) and np.array_equal(y, _tone())
+        out = A.apply_multiple(wav, actions, save=True)
+        saved, _ = sf.read(out, dtype='float32')
+        results['pipeline_saved'] = Path(out).name == 'tone_pipeline.wav' and np.allclose(saved, expected, atol=1e-4)
+        return results
+
+
+def _audio_paths_stage(out_dir):
+    # streamed (path-in/path-out) audio ops; scratch files only
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        A = AudioEnhancer(output_dir=str(tmp))
+        y = _tone()
+        wav = str(tmp / 'tone.wav')
+        sf.write(wav, y, SR)
+        results = {}
+
+        print('9) Streamed audio cut / reverse...')
+        cut_path = A.cut(wav, 0.25, 0.75, save=True)
+        results['path_audio_cut'] = abs(sf.info(cut_path).frames - SR // 2) <= 1
+        rev, _ = sf.read(A.reverse(wav, save=True), dtype='float32')
+        results['path_audio_reverse'] = np.allclose(rev, y[::-1], atol=1e-3)
+        return results
+
+
+def _piped_matches_memory(V, src, src_dur, output, saturation):
+    # same look as the in-memory (MoviePy) path, up to codec noise, and the source audio kept
+    reference = V.adjust_color(src, brightness=1.05, contrast=1.1, saturation=saturation)
+    out = V.adjust_color(src, brightness=1.05, contrast=1.1, saturation=saturation, save=True, output=output)
+    piped = VideoFileClip(out)
+    diff = np.abs(piped.get_frame(0.5).astype(int) - reference.get_frame(0.5)).mean()
+    info = ffmpeg_parse_infos(out)
+    piped.close()
+    V.close()
+    return info['audio_found'] and abs(info['duration'] - src_dur) < 0.1 and diff < 4
+
+
+def _rgb_pipe_stage(out_dir):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        V = VideoEnhancer(output_dir=str(tmp))
+        wav, src, src_dur = _sources(tmp)
+
+        print('10) Color adjust through the rgb24 pipe...')
+        # saturation != 1 keeps adjust_color off the yuv420p pipe
+        return {'path_color_rgb24': _piped_matches_memory(V, src, src_dur, str(tmp / 'rgb24.mp4'), saturation=0.9)}
+
+
+def _yuv_pipe_stage(out_dir):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        V = VideoEnhancer(output_dir=str(tmp))
+        wav, src, src_dur = _sources(tmp)
+
+        print('10b) Color adjust through the yuv420p pipe...')
+        # saturation 1: brightness/contrast only, done on the planes with lookup tables
+        return {'path_color_yuv420p': _piped_matches_memory(V, src, src_dur, str(tmp / 'yuv420p.mp4'), saturation=1.0)}
+
+
+def _video_pipeline_stage(out_dir):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        V = VideoEnhancer(output_dir=str(tmp / 'video'))
+        wav, src, src_dur = _sources(tmp)
+
+        print('16) Chained filters encode once...')
+        out = V.pipeline(src).color(brightness=1.05, contrast=1.1, saturation=0.9).speed(2.0).trim(0, 0.4).save()
+        info = ffmpeg_parse_infos(out)
+        return {'video_pipeline': (
+            Path(out).name == 'src_color_adj_speed2.0_cut0-0.4.mp4'
+            and os.listdir(V.output_dir) == [Path(out).name]  # no per-step intermediate files
+            and abs(info['duration'] - 0.4) < 0.1
+            and info['audio_found']
+            and len(V._open_clips) == 0
+        )}
+
+
+def _speed_stage(out_dir):
+    # path-in/path-out speed change (one ffmpeg setpts/atempo run); scratch files only
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        V = VideoEnhancer(output_dir=str(tmp))
+        results = {}
+        wav, src, src_dur = _sources(tmp)
+
+        print('12) ffmpeg speed change...')
+        info = ffmpeg_parse_infos(V.speed_change(src, 2.0, save=True))
+        results['path_speed_change'] = info['audio_found'] and abs(info['duration'] - src_dur / 2) < 0.1
+
+        print('12c) atempo chains outside 0.5-2x...')
+        chains_ok = True
+        for factor in (3.0, 0.4, 5.0, 0.2):
+            stages = [float(f.split('=')[1]) for f in _atempo_chain(factor).split(',')]
+            chains_ok &= all(0.5 <= f <= 2.0 for f in stages) and abs(np.prod(stages) - factor) < 1e-9
+        try:
+            _atempo_chain(0)
+            chains_ok = False
+        except ValueError:
+            pass
+        results['atempo_chain'] = chains_ok
+        for factor in (3.0, 0.4):
+            out = V.speed_change(src, factor, save=True)
+            audio = AudioFileClip(out)
+            results[f'path_speed_{factor}'] = (
+                abs(ffmpeg_parse_infos(out)['duration'] - src_dur / factor) < 0.1
+                and abs(audio.duration - src_dur / factor) < 0.1
+            )
+            audio.close()
+        return results
+
+
+def _extract_audio_stage(out_dir):
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        V = VideoEnhancer(output_dir=str(tmp))
+        wav, src, src_dur = _sources(tmp)
+
+        print('12b) ffmpeg audio extract...')
+        audio = AudioFileClip(V.extract_audio(src, save=True))
+        ok = abs(audio.duration - src_dur) < 0.15  # mp3 encoder padding
+        audio.close()
+        return {'path_extract_audio': ok}
+
+
+def run_smoke_test():
+    root = Path(__file__).resolve().parents[1]
+    out_dir = root / 'test_outputs'
+    (out_dir).mkdir(parents=True, exist_ok=True)
+
+    print('OUT_DIR:', out_dir)
+
+    # the stages share no files, so run them side by side, one process each
+    stages = (_audio_stage, _video_stage, _merge_stage, _attach_audio_stage, _speed_stage,
+              _stream_copy_stage, _normalize_stage, _chain_stage, _audio_paths_stage,
+              _audio_pipeline_stage, _rgb_pipe_stage, _video_pipeline_stage,
+              _yuv_pipe_stage, _extract_audio_stage)
+    results = {}
+    with ProcessPoolExecutor(max_workers=min(len(stages), os.cpu_count() or 1)) as pool:
+        futures = [pool.submit(stage, out_dir) for stage in stages]
+        for future in futures:
+            results.update(future.result())
+
     print('\nSMOKE TEST RESULTS:')
     ok = True
     for k, v in results.items():
@@ -71,15 +341,6 @@ def run_smoke_test():
         if not v:
             ok = False
 
-    # cleanup: close clips
-    try:
-        clip.close()
-        new_clip.close()
-        merged_clip.close()
-        final_clip.close()
-    except Exception:
-        pass
-
     return ok, results
 
 